@@ -0,0 +1,188 @@
+"""
+Analysis Ensemble
+Run the quality analyzer several times and report consensus scores with confidence intervals
+
+The memo is first analyzed once on the standard tier. If that report is
+complete and its overall score is consistent with its section scores, it is
+used as is, so stable memos cost one call. Otherwise analyses are issued in
+concurrent waves on the ensemble model. After each wave the overall and
+section scores are compared; once every score's spread (max - min) is within
+the tolerance, no further waves are sent. Only ambiguous memos use up to
+max_runs analyses.
+"""
+
+import math
+import statistics
+
+from llm_client import DEFAULT_MODEL, DEFAULT_TIMEOUT, FAST_MODEL, create_async_client
+from quality_analyzer import analyze_memo_quality_async, quality_report_problem
+
+DEFAULT_MAX_RUNS = 6
+DEFAULT_WAVE_SIZE = 2
+DEFAULT_TOLERANCE = 1.0  # score points
+
+# Two-sided 95% Student t critical values by degrees of freedom (normal beyond the table)
+T_CRITICAL_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+                 10: 2.228, 15: 2.131, 20: 2.086, 30: 2.042}
+
+
+def t_critical(df):
+    for limit in sorted(T_CRITICAL_95):
+        if df <= limit:
+            return T_CRITICAL_95[limit]
+    return 1.96
+
+
+def score_stats(scores):
+    """Mean, variance, spread and 95% confidence interval of a list of scores"""
+    mean = statistics.fmean(scores)
+    variance = statistics.variance(scores) if len(scores) > 1 else 0.0
+    if len(scores) > 1:
+        half_width = t_critical(len(scores) - 1) * math.sqrt(variance / len(scores))
+        ci95 = [round(max(0.0, mean - half_width), 2), round(min(10.0, mean + half_width), 2)]
+    else:
+        ci95 = None  # undefined for a single run
+    return {
+        'mean': round(mean, 2),
+        'variance': round(variance, 3),
+        'spread': max(scores) - min(scores),
+        'ci95': ci95,
+        'scores': scores
+    }
+
+
+def is_score(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 10
+
+
+def invalid_report_reason(report):
+    """None if a run's report can be used in the ensemble, else why it is dropped"""
+    if not isinstance(report, dict):
+        return f"report is {type(report).__name__}, not a JSON object"
+    if not is_score(report.get('overall_score')):
+        return f"invalid overall_score: {report.get('overall_score')!r}"
+    if not isinstance(report.get('section_scores', {}), dict):
+        return "section_scores is not a JSON object"
+    return None
+
+
+def ensemble_stats(reports):
+    """Score statistics for the overall score and every section found in any report"""
+    names = {}
+    for r in reports:
+        names.update(dict.fromkeys(r.get('section_scores', {})))
+    sections = {}
+    for name in names:
+        scores = [r['section_scores'][name]['score'] for r in reports
+                  if isinstance(r.get('section_scores', {}).get(name), dict)
+                  and is_score(r['section_scores'][name].get('score'))]
+        if scores:
+            sections[name] = score_stats(scores)
+    return {'overall_score': score_stats([r['overall_score'] for r in reports]), 'sections': sections}
+
+
+def scores_agree(stats, tolerance=DEFAULT_TOLERANCE):
+    return all(s['spread'] <= tolerance for s in [stats['overall_score']] + list(stats['sections'].values()))
+
+
+def consensus_report(reports, stats):
+    """
+    Use the run closest to the mean overall score for the written assessment,
+    with scores replaced by the ensemble means
+    Sections that run left out are taken from the first other run that has them
+    """
+    mean = stats['overall_score']['mean']
+    report = dict(min(reports, key=lambda r: abs(r['overall_score'] - mean)))
+    report['overall_score'] = round(mean, 1)
+    sections = dict(report.get('section_scores', {}))
+    for r in reports:
+        for name, section in r.get('section_scores', {}).items():
+            if isinstance(section, dict):
+                sections.setdefault(name, section)
+    report['section_scores'] = {
+        name: dict(section, score=round(stats['sections'][name]['mean'], 1)) if name in stats['sections'] else section
+        for name, section in sections.items()
+    }
+    report['metadata'] = dict(report.get('metadata') or {})
+    return report
+
+
+async def analyze_memo_ensemble_async(memo_content, memo_filepath=None, prompt_version=None,
+                                      max_runs=DEFAULT_MAX_RUNS, wave_size=DEFAULT_WAVE_SIZE,
+                                      tolerance=DEFAULT_TOLERANCE, model=FAST_MODEL,
+                                      client=None, timeout=DEFAULT_TIMEOUT, probe_model=DEFAULT_MODEL):
+    """
+    Analyze a memo once on `probe_model` and return that report if it passes the confidence
+    check; otherwise analyze it in waves of `wave_size` concurrent runs on `model` until the
+    scores agree within `tolerance` or `max_runs` analyses (the probe included) have been made
+    probe_model=None skips the probe
+    Failed runs (API errors, unparseable JSON, missing or out-of-range scores) are skipped;
+    raises if every run fails
+    """
+    import asyncio
+
+    if client is None:
+        async with create_async_client() as client:
+            return await analyze_memo_ensemble_async(memo_content, memo_filepath, prompt_version, max_runs,
+                                                     wave_size, tolerance, model, client, timeout, probe_model)
+
+    reports = []
+    failures = []
+    attempted = 0
+    stats = None
+    probe = {'model': probe_model, 'accepted': False, 'reason': None}
+    if probe_model:
+        attempted += 1
+        try:
+            result = await analyze_memo_quality_async(memo_content, memo_filepath, prompt_version, client,
+                                                      timeout, probe_model)
+            probe['reason'] = invalid_report_reason(result) or quality_report_problem(result)
+        except Exception as e:
+            probe['reason'] = f"{type(e).__name__}: {e}"
+        if probe['reason'] is None:
+            probe['accepted'] = True
+            reports.append(result)
+
+    while not probe['accepted'] and attempted < max_runs:
+        wave = min(max(wave_size, 2 - len(reports)), max_runs - attempted)
+        attempted += wave
+        results = await asyncio.gather(
+            *[analyze_memo_quality_async(memo_content, memo_filepath, prompt_version, client, timeout, model)
+              for _ in range(wave)],
+            return_exceptions=True
+        )
+        for result in results:
+            reason = f"{type(result).__name__}: {result}" if isinstance(result, Exception) else invalid_report_reason(result)
+            if reason:
+                failures.append(reason)
+            else:
+                reports.append(result)
+
+        if len(reports) >= 2:
+            stats = ensemble_stats(reports)
+            if scores_agree(stats, tolerance):
+                break
+
+    if not reports:
+        raise RuntimeError(f"All {attempted} ensemble analyses failed: {(failures or [probe['reason']])[-1]}")
+
+    stats = stats or ensemble_stats(reports)
+    report = consensus_report(reports, stats)
+    report['metadata']['ensemble'] = {
+        'model': probe_model if probe['accepted'] else model,
+        'runs': len(reports),
+        'failed_runs': len(failures),
+        'max_runs': max_runs,
+        'tolerance': tolerance,
+        'agreed': len(reports) >= 2 and scores_agree(stats, tolerance),
+        'stopped_early': attempted < max_runs,
+        'probe': probe,
+        **stats
+    }
+    return report
+
+
+def analyze_memo_ensemble(memo_content, memo_filepath=None, prompt_version=None, **kwargs):
+    """Sync wrapper around analyze_memo_ensemble_async"""
+    import asyncio
+    return asyncio.run(analyze_memo_ensemble_async(memo_content, memo_filepath, prompt_version, **kwargs))
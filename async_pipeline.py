@@ -0,0 +1,152 @@
+"""
+Async Pipeline
+Drive many fetch → generate → analyze jobs from one event loop
+
+Submissions for the same company (same canonical key) are coalesced into one
+job, and companies with artifacts inside the freshness window are returned
+without any API calls.
+"""
+
+import asyncio
+
+import company_registry
+import memo_versions
+from deal_memo_generator import fetch_website_content_async, generate_deal_memo_async, save_memo
+from quality_analyzer import analyze_memo_quality_async, read_memo, save_quality_report
+from llm_client import DEFAULT_TIMEOUT, create_async_client
+from prompt_registry import get_prompt
+
+DEFAULT_CONCURRENCY = 20
+
+
+async def registry_call(lock, fn, *args):
+    """Run a blocking registry call (sqlite, memo file hashing) in a worker thread, one at a time"""
+    async with lock:
+        return await asyncio.to_thread(fn, *args)
+
+
+async def process_company_async(company_url, client, http_client, semaphore,
+                                prompt_version=None, analyze=True, timeout=DEFAULT_TIMEOUT,
+                                registry=None, company_key=None, registry_lock=None):
+    """
+    Fetch, generate and (optionally) analyze one company; errors are returned, not raised
+    Artifacts are recorded in the company registry when one is given; jobs sharing a registry
+    connection must share registry_lock
+    """
+    if not company_url.startswith('http'):
+        company_url = 'https://' + company_url
+    company_key = company_key or company_registry.canonical_company_key(company_url)
+    registry_lock = registry_lock or asyncio.Lock()
+
+    result = {'url': company_url, 'company_key': company_key}
+    async with semaphore:
+        company_data = await fetch_website_content_async(company_url, http_client)
+        if 'error' in company_data and company_data['content'] == '':
+            result['error'] = f"fetch failed: {company_data['error']}"
+            return result
+        if registry is not None:
+            await registry_call(registry_lock, company_registry.record_fetch, registry, company_key, company_url,
+                                company_data)
+
+        try:
+            memo = await generate_deal_memo_async(company_data, prompt_version, client, timeout)
+            result['memo_file'] = await asyncio.to_thread(save_memo, company_url, memo, prompt_version)
+            if registry is not None:
+                await registry_call(registry_lock, company_registry.record_memo, registry, company_key, company_url,
+                                    result['memo_file'], get_prompt('deal_memo', prompt_version).label)
+
+            if analyze:
+                # Analyze the saved file, like the CLI and queue do: its header carries the prompt version
+                memo_content = await asyncio.to_thread(read_memo, result['memo_file'])
+                quality_report = await analyze_memo_quality_async(
+                    memo_content, result['memo_file'], client=client, timeout=timeout
+                )
+                if registry is not None:
+                    await registry_call(registry_lock, memo_versions.annotate_quality_report, registry,
+                                        quality_report, result['memo_file'])
+                result['quality_report'] = quality_report
+                result['quality_files'] = await asyncio.to_thread(save_quality_report, quality_report,
+                                                                  result['memo_file'])
+                if registry is not None:
+                    await registry_call(registry_lock, company_registry.record_quality, registry, result['memo_file'],
+                                        result['quality_files'][0], quality_report.get('overall_score'))
+        except asyncio.TimeoutError:
+            result['error'] = f"timed out after {timeout}s"
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+
+    return result
+
+
+async def resolve_company_keys_async(registry, company_urls, resolve_redirects=True):
+    """Canonical keys for many URLs; uncached redirect lookups run concurrently in threads"""
+    if not resolve_redirects:
+        return [company_registry.canonical_company_key(url) for url in company_urls]
+
+    keys = [company_registry.cached_company_key(registry, url) for url in company_urls]
+    pending = {}
+    for url, key in zip(company_urls, keys):
+        input_key = company_registry.canonical_company_key(url)
+        if key is None and input_key not in pending:
+            pending[input_key] = asyncio.to_thread(company_registry.follow_redirects, url)
+
+    final_urls = dict(zip(pending, await asyncio.gather(*pending.values())))
+    resolved = {}
+    for input_key, final_url in final_urls.items():
+        resolved[input_key] = company_registry.remember_alias(registry, input_key, final_url)
+
+    return [key or resolved[company_registry.canonical_company_key(url)] for url, key in zip(company_urls, keys)]
+
+
+async def run_companies_async(company_urls, concurrency=DEFAULT_CONCURRENCY, prompt_version=None,
+                              analyze=True, timeout=DEFAULT_TIMEOUT,
+                              freshness_seconds=company_registry.DEFAULT_FRESHNESS_SECONDS,
+                              db_path=company_registry.DEFAULT_DB_PATH, resolve_redirects=True):
+    """
+    Process many companies with at most `concurrency` jobs in flight
+    One AsyncAnthropic client and one HTTP client are shared by all jobs; results keep input order
+    """
+    import httpx
+
+    registry = company_registry.connect(db_path)
+    try:
+        company_keys = await resolve_company_keys_async(registry, company_urls, resolve_redirects)
+        prompt_label = get_prompt('deal_memo', prompt_version).label
+        stage = "analyze" if analyze else "generate"
+
+        semaphore = asyncio.Semaphore(concurrency)
+        registry_lock = asyncio.Lock()
+        async with create_async_client() as client, httpx.AsyncClient(follow_redirects=True) as http_client:
+            tasks = {}
+            for url, key in zip(company_urls, company_keys):
+                if key in tasks:
+                    continue
+                existing = company_registry.fresh_artifacts(registry, key, freshness_seconds, stage, prompt_label)
+                if existing:
+                    tasks[key] = {'url': url, 'company_key': key, 'memo_file': existing['memo_file'],
+                                  'quality_json': existing['quality_json'], 'overall_score': existing['overall_score'],
+                                  'fresh': True}
+                else:
+                    tasks[key] = asyncio.ensure_future(process_company_async(
+                        url, client, http_client, semaphore, prompt_version, analyze, timeout, registry, key,
+                        registry_lock
+                    ))
+
+            await asyncio.gather(*[task for task in tasks.values() if asyncio.isfuture(task)])
+
+        results = []
+        first_url = {}
+        for url, key in zip(company_urls, company_keys):
+            task = tasks[key]
+            result = dict(task if isinstance(task, dict) else task.result())
+            if first_url.setdefault(key, url) != url:
+                result.update(url=url, coalesced_with=first_url[key])
+            results.append(result)
+        return results
+    finally:
+        registry.close()
+
+
+def run_companies(company_urls, **kwargs):
+    """Sync wrapper around run_companies_async for scripts and the CLI"""
+    return asyncio.run(run_companies_async(company_urls, **kwargs))
@@ -0,0 +1,76 @@
+"""
+Startup Benchmark
+Measures import time of the CLI entry points and checks it against a budget
+
+Usage:
+    python3 bench_startup.py [--runs N] [--budget-ms MS]
+
+Each entry point is imported in a fresh interpreter so results are not
+skewed by modules already cached in this process. The run fails (exit 1)
+if any median import time exceeds the budget or if a heavy dependency
+(anthropic, requests, bs4) is imported at module load.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ["cli", "deal_memo_generator", "quality_analyzer", "improvement_engine", "prompt_registry", "report_renderers", "quality_archive", "trend_rollups"]
+HEAVY_MODULES = ["anthropic", "requests", "httpx", "bs4"]
+DEFAULT_BUDGET_MS = 50
+
+MEASURE_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{'ms': elapsed, 'heavy': heavy}}))
+"""
+
+
+def measure_import(module, runs):
+    """Import a module in fresh interpreters and return (timings_ms, heavy_modules)"""
+    timings = []
+    heavy = []
+    snippet = MEASURE_SNIPPET.format(module=module, heavy=HEAVY_MODULES)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        timings.append(result['ms'])
+        heavy = result['heavy']
+    return timings, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure entry point import times")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("STARTUP BENCHMARK")
+    print(f"Budget: {args.budget_ms:.0f} ms median import time per entry point")
+    print("=" * 70)
+    print()
+
+    failed = False
+    for module in ENTRY_POINTS:
+        timings, heavy = measure_import(module, args.runs)
+        median = statistics.median(timings)
+        ok = median <= args.budget_ms and not heavy
+        failed = failed or not ok
+
+        status = "✓" if ok else "✗"
+        print(f"{status} {module:<22} median {median:7.1f} ms  (min {min(timings):.1f}, max {max(timings):.1f})")
+        if heavy:
+            print(f"   Heavy modules loaded at import: {', '.join(heavy)}")
+
+    print()
+    print("=" * 70)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
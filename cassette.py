@@ -0,0 +1,227 @@
+"""
+Cassette
+Record and replay LLM and web calls, for offline, deterministic pipeline runs
+
+In record mode, every wrapped call (messages.create, website fetches and
+redirect lookups) runs live. Its request and response are also stored in a
+cassette, a SQLite file holding zlib-compressed JSON. In replay mode, the
+same calls are answered from the cassette, loaded into memory on first use,
+and nothing touches the network. Recorded errors are raised again on replay.
+
+Identical requests (e.g. ensemble runs) are replayed in recorded order; once
+the recorded responses run out, the last one is repeated.
+
+The mode is taken from the environment, so queue worker processes inherit it:
+    MEMO_CASSETTE=run.cassette MEMO_CASSETTE_MODE=record|replay
+"""
+
+import os
+import re
+import json
+import zlib
+import time
+import base64
+import builtins
+import hashlib
+import threading
+
+CASSETTE_ENV = "MEMO_CASSETTE"
+MODE_ENV = "MEMO_CASSETTE_MODE"
+MODES = ("record", "replay")
+
+# Lines that change on every run without changing the request's meaning, e.g. the
+# "*Generated: ...*" header save_memo writes (memos are part of the analyzer prompt)
+VOLATILE_LINES = re.compile(r"^\*Generated: [^\n]*\*$", re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    request BLOB NOT NULL,
+    response BLOB NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (key, seq)
+);
+"""
+
+_lock = threading.Lock()
+_state = {'path': None, 'mode': None, 'conn': None, 'replay': None, 'counters': {}}
+
+
+class CassetteMiss(LookupError):
+    """Replay mode got a request that was never recorded"""
+
+
+class ReplayedError(Exception):
+    """An error (of a non built-in type) that was raised when the interaction was recorded"""
+
+
+def use_cassette(path, mode):
+    """Switch this process (and child processes started afterwards) to record or replay mode"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown cassette mode: {mode} (expected one of {', '.join(MODES)})")
+    os.environ[CASSETTE_ENV] = path
+    os.environ[MODE_ENV] = mode
+    _reset()
+
+
+def _reset():
+    if _state['conn'] is not None:
+        _state['conn'].close()
+    _state.update(path=None, mode=None, conn=None, replay=None, counters={})
+
+
+def active_mode():
+    """'record', 'replay' or None"""
+    mode = os.environ.get(MODE_ENV)
+    return mode if os.environ.get(CASSETTE_ENV) and mode in MODES else None
+
+
+def _connect(path):
+    import sqlite3
+
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _open():
+    """Connection for the configured cassette, reopened if the environment changed"""
+    path, mode = os.environ.get(CASSETTE_ENV), active_mode()
+    if (_state['path'], _state['mode']) != (path, mode):
+        _reset()
+        _state.update(path=path, mode=mode, conn=_connect(path))
+        if mode == "replay":
+            # Load everything up front; replay then never waits on disk
+            replay = {}
+            for row in _state['conn'].execute("SELECT key, response FROM interactions ORDER BY key, seq"):
+                replay.setdefault(row[0], []).append(row[1])
+            _state['replay'] = replay
+    return _state['conn']
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=_encode_bytes).encode('utf-8'))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'), object_hook=_decode_bytes)
+
+
+def _encode_bytes(value):
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"Cannot store {type(value).__name__} in a cassette")
+
+
+def _decode_bytes(value):
+    return base64.b64decode(value['__bytes__']) if set(value) == {'__bytes__'} else value
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return VOLATILE_LINES.sub("", value)
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    return value
+
+
+def request_key(kind, request):
+    """Hash identifying a request; volatile lines (timestamps) don't count"""
+    normalized = json.dumps([kind, _normalize(request)], sort_keys=True, default=_encode_bytes)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _label(kind, request):
+    if 'url' in request:
+        return f"{request.get('method', 'GET')} {request['url']}"
+    prompt = request.get('messages', [{}])[-1].get('content', '')
+    return f"{request.get('model')} {' '.join(prompt.split())[:80]}"
+
+
+def _record(kind, request, response):
+    key = request_key(kind, request)
+    with _lock:
+        conn = _open()
+        conn.execute(
+            "INSERT INTO interactions (key, seq, kind, label, request, response, recorded_at) "
+            "VALUES (?, (SELECT COALESCE(MAX(seq) + 1, 0) FROM interactions WHERE key = ?), ?, ?, ?, ?, ?)",
+            (key, key, kind, _label(kind, request), _pack(request), _pack(response), time.time())
+        )
+
+
+def _replay(kind, request):
+    key = request_key(kind, request)
+    with _lock:
+        _open()
+        responses = _state['replay'].get(key)
+        if not responses:
+            raise CassetteMiss(f"No recorded {kind} interaction for {_label(kind, request)} in {_state['path']}")
+        seq = _state['counters'].get(key, 0)
+        _state['counters'][key] = seq + 1
+        response = _unpack(responses[min(seq, len(responses) - 1)])
+    if 'error' in response:
+        # Built-in exceptions (TimeoutError, ConnectionError, ...) come back as themselves
+        error_type = getattr(builtins, response.get('error_type', ''), None)
+        if isinstance(error_type, type) and issubclass(error_type, Exception):
+            raise error_type(response['error'])
+        raise ReplayedError(response['error'])
+    return response['value']
+
+
+def call(kind, request, fn, encode=None, decode=None):
+    """
+    Run fn() through the active cassette
+    request must be JSON-serializable and identify the call; encode/decode convert the result
+    to and from something JSON-serializable (bytes are fine)
+    """
+    mode = active_mode()
+    if mode == "replay":
+        value = _replay(kind, request)
+        return decode(value) if decode else value
+    if mode is None:
+        return fn()
+
+    try:
+        result = fn()
+    except Exception as e:
+        _record(kind, request, {'error': str(e), 'error_type': type(e).__name__})
+        raise
+    _record(kind, request, {'value': encode(result) if encode else result})
+    return result
+
+
+async def call_async(kind, request, coro_fn, encode=None, decode=None):
+    """Async counterpart of call(); coro_fn() returns the awaitable to run when not replaying"""
+    mode = active_mode()
+    if mode == "replay":
+        value = _replay(kind, request)
+        return decode(value) if decode else value
+    if mode is None:
+        return await coro_fn()
+
+    try:
+        result = await coro_fn()
+    except Exception as e:
+        _record(kind, request, {'error': str(e), 'error_type': type(e).__name__})
+        raise
+    _record(kind, request, {'value': encode(result) if encode else result})
+    return result
+
+
+def cassette_summary(path):
+    """Interaction counts per kind, distinct requests and file size of a cassette"""
+    conn = _connect(path)
+    try:
+        kinds = {row[0]: {'interactions': row[1], 'requests': row[2]} for row in conn.execute(
+            "SELECT kind, COUNT(*), COUNT(DISTINCT key) FROM interactions GROUP BY kind ORDER BY kind"
+        )}
+        stored = conn.execute("SELECT COALESCE(SUM(LENGTH(request) + LENGTH(response)), 0) FROM interactions").fetchone()[0]
+    finally:
+        conn.close()
+    return {'path': path, 'kinds': kinds, 'stored_bytes': stored, 'file_bytes': os.path.getsize(path)}
@@ -0,0 +1,478 @@
+"""
+Deal Memo Quality System CLI
+One entry point for the generator, analyzer, improvement engine and prompt registry
+
+Usage:
+    python3 cli.py generate [URL] [--prompt-version V]
+    python3 cli.py analyze MEMO_FILE [--prompt-version V] [--ensemble N] [--tolerance T]
+    python3 cli.py batch [URLS...] [--file URLS_FILE] [--concurrency N]
+    python3 cli.py queue submit|work|stats|dead|retry [URLS...] [--workers N]
+    python3 cli.py improve [--feedback-dir DIR] [--streaming]
+    python3 cli.py report QUALITY_JSON
+    python3 cli.py render [PATHS...] [--format text,markdown,html,csv] [--output-dir DIR]
+    python3 cli.py archive build|get|column [PATHS...] [--key MEMO] [--column NAME]
+    python3 cli.py patterns [--feedback-dir DIR] [--streaming]
+    python3 cli.py trends [--granularity day|week] [--kind feedback|quality] [--rebuild]
+    python3 cli.py versions list|diff COMPANY [--from V] [--to V] [--summary]
+    python3 cli.py cassette CASSETTE
+    python3 cli.py prompts [list | promote NAME VERSION]
+
+Global options --max-cost USD and --max-latency SECONDS set the per-call budget
+used to route generation and analysis between the fast and standard models.
+Global options --record CASSETTE and --replay CASSETTE capture or serve back every
+API call and website fetch, so a run can be repeated offline.
+
+Only the generate, analyze, batch and improve commands import the network/LLM
+libraries (requests, httpx, bs4, anthropic); everything else runs offline.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import deal_memo_generator
+import quality_analyzer
+import improvement_engine
+import prompt_registry
+import model_router
+import cassette
+
+
+def cmd_generate(args):
+    deal_memo_generator.main(args.url, args.prompt_version, args.fresh_hours * 3600)
+
+
+def cmd_analyze(args):
+    quality_analyzer.main(args.memo_file, args.prompt_version, args.ensemble, args.tolerance, args.model)
+
+
+def cmd_improve(args):
+    improvement_engine.main(args.feedback_dir, args.streaming, args.reservoir_size, args.db)
+
+
+def cmd_batch(args):
+    """Generate (and analyze) memos for many companies concurrently"""
+    import async_pipeline
+
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, 'r') as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not urls:
+        print("❌ No company URLs given")
+        return 1
+
+    print(f"📊 Processing {len(urls)} companies, up to {args.concurrency} at a time...")
+    results = async_pipeline.run_companies(
+        urls, concurrency=args.concurrency, prompt_version=args.prompt_version,
+        analyze=not args.no_analyze, timeout=args.timeout, freshness_seconds=args.fresh_hours * 3600
+    )
+
+    failed = 0
+    for result in results:
+        if 'error' in result:
+            failed += 1
+            print(f"❌ {result['url']}: {result['error']}")
+        else:
+            score = result.get('quality_report', {}).get('overall_score', result.get('overall_score'))
+            icon = "♻️ " if result.get('fresh') else "🔗" if result.get('coalesced_with') else "✅"
+            print(f"{icon} {result['url']}: {result['memo_file']}" + (f" ({score}/10)" if score is not None else ""))
+
+    print()
+    print(f"Done: {len(results) - failed} succeeded, {failed} failed")
+    if model_router.routing_summary():
+        print(model_router.routing_summary())
+    return 1 if failed else 0
+
+
+def cmd_queue(args):
+    """Submit companies to the job queue, run workers, or show queue status"""
+    import job_queue
+
+    conn = job_queue.connect(args.db)
+
+    if args.action == "submit":
+        urls = list(args.urls)
+        if args.file:
+            with open(args.file, 'r') as f:
+                urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+        freshness_seconds = args.fresh_hours * 3600
+        for url in urls:
+            submission = job_queue.submit_company(conn, url, args.prompt_version, freshness_seconds=freshness_seconds)
+            job_ids = ', '.join(str(job_id) for job_id in submission['job_ids'])
+            if submission['status'] == 'fresh':
+                company = submission['company']
+                print(f"♻️  {url} → {submission['company_key']}: up to date ({company['memo_file']}, {company['quality_json']})")
+            elif submission['status'] == 'coalesced':
+                print(f"🔗 {url} → {submission['company_key']}: already in flight (jobs {job_ids})")
+            else:
+                print(f"📥 {url} → {submission['company_key']}: jobs {job_ids}")
+        return
+
+    if args.action == "work":
+        conn.close()
+        print(f"👷 Starting {args.workers} worker(s) on {args.db}" + (" (exit when idle)" if args.exit_when_idle else ""))
+        job_queue.run_workers(args.db, args.workers, args.stages, args.exit_when_idle)
+        conn = job_queue.connect(args.db)
+        print(job_queue.generate_queue_report(job_queue.queue_stats(conn)))
+        return
+
+    if args.action == "dead":
+        for job in job_queue.dead_letters(conn):
+            url = json.loads(job['payload']).get('url')
+            print(f"💀 job {job['id']} {job['stage']} {url} ({job['attempts']} attempts): {job['error']}")
+        return
+
+    if args.action == "retry":
+        count = job_queue.retry_dead(conn, args.job_id)
+        if not count:
+            print(f"❌ Job {args.job_id} is not dead-lettered")
+            return 1
+        print(f"🔁 Requeued {count} job(s)")
+        return
+
+    print(job_queue.generate_queue_report(job_queue.queue_stats(conn)))
+
+
+def cmd_report(args):
+    """Re-render an existing quality report without calling the API"""
+    with open(args.quality_json, 'r') as f:
+        quality_report = json.load(f)
+    print(quality_analyzer.generate_quality_report_text(quality_report))
+
+
+def cmd_render(args):
+    """Re-render existing quality reports in other formats without calling the API"""
+    import report_renderers
+
+    formats = [name.strip() for name in args.format.split(",") if name.strip()]
+    csv_path = None
+    if "csv" in formats:
+        formats.remove("csv")
+        csv_path = args.csv_file or os.path.join(args.output_dir or ".", "quality_summary.csv")
+
+    unknown = [name for name in formats if name not in report_renderers.RENDERERS]
+    if unknown:
+        available = ", ".join(sorted(report_renderers.RENDERERS) + ["csv"])
+        print(f"❌ Unknown format(s): {', '.join(unknown)} (available: {available})")
+        return 1
+
+    json_filepaths = report_renderers.find_quality_reports(args.paths)
+    if not json_filepaths:
+        print("❌ No *_quality.json files found")
+        return 1
+
+    print(f"🖨️  Rendering {len(json_filepaths)} report(s) as {', '.join(formats + (['csv'] if csv_path else []))}...")
+
+    rendered = 0
+    errors = []
+    for result in report_renderers.render_reports(json_filepaths, formats, args.output_dir, csv_path, args.workers):
+        if 'error' in result:
+            errors.append(result)
+        else:
+            rendered += 1
+
+    print(f"✅ Rendered {rendered} report(s)")
+    if csv_path:
+        print(f"📊 CSV summary: {csv_path}")
+    for result in errors:
+        print(f"❌ {result['source']}: {result['error']}")
+    return 1 if errors else 0
+
+
+def cmd_archive(args):
+    """Pack quality reports into segment files, or read a report/column back out"""
+    import quality_archive
+
+    if args.action == "build":
+        from report_renderers import find_quality_reports
+
+        json_filepaths = find_quality_reports(args.paths or ["."])
+        if not json_filepaths:
+            print("❌ No *_quality.json files found")
+            return 1
+        source_bytes = sum(os.path.getsize(path) for path in json_filepaths)
+        errors, outdated = [], []
+        segments = quality_archive.convert_reports(json_filepaths, args.output_dir, args.segment_size,
+                                                   errors=errors, outdated=outdated)
+        archive_bytes = sum(os.path.getsize(path) for path, _ in segments)
+        for path, count in segments:
+            print(f"📦 {path}: {count} report(s)")
+        archived = sum(count for _, count in segments)
+        already = len(json_filepaths) - archived - len(errors)
+        skipped = f" ({already} already archived)" if already else ""
+        print(f"✅ {archived} report(s){skipped}, {source_bytes:,} bytes of JSON → {archive_bytes:,} bytes")
+        for source, key in outdated:
+            print(f"⚠️  {source}: newer than the archived report for {key}, not archived "
+                  f"(archived reports are never replaced; build into a new --output-dir to include it)")
+        for source, error in errors:
+            print(f"❌ {source}: {error}")
+        return 1 if errors else 0
+
+    segment_paths = quality_archive.find_segments(args.paths or [args.output_dir])
+
+    if args.action == "get":
+        if not args.key:
+            print("❌ Usage: cli.py archive get [SEGMENTS...] --key MEMO_FILE")
+            return 1
+        quality_report = quality_archive.find_report(segment_paths, args.key)
+        if quality_report is None:
+            print(f"❌ {args.key} not found")
+            return 1
+        if args.json:
+            print(json.dumps(quality_report, indent=2))
+        else:
+            print(quality_analyzer.generate_quality_report_text(quality_report))
+        return
+
+    if not args.column:
+        print("❌ Usage: cli.py archive column [SEGMENTS...] --column NAME")
+        return 1
+    try:
+        for key, value in quality_archive.scan_column(segment_paths, args.column):
+            print(f"{key}\t{json.dumps(value) if isinstance(value, (list, dict)) else value}")
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+
+
+def cmd_patterns(args):
+    """Print the feedback pattern report without generating a new prompt"""
+    if args.streaming:
+        feedback_data = improvement_engine.iter_feedback_files(args.feedback_dir)
+    else:
+        feedback_data = improvement_engine.load_feedback_files(args.feedback_dir)
+    analysis = improvement_engine.analyze_feedback_patterns(feedback_data, args.streaming, args.reservoir_size)
+    if not analysis:
+        return 1
+    analysis['trends'] = improvement_engine.load_trends(args.feedback_dir, db_path=args.db)
+    print(improvement_engine.generate_pattern_report(analysis))
+    if args.streaming:
+        print()
+        improvement_engine.print_streaming_summary(analysis)
+
+
+def cmd_trends(args):
+    """Print trends and drift from the precomputed rollups (ingesting any new files first)"""
+    import trend_rollups
+
+    conn = trend_rollups.connect(args.db)
+    if args.rebuild:
+        ingested = trend_rollups.rebuild_rollups(conn, args.feedback_dir, args.feedback_dir)
+    else:
+        ingested = trend_rollups.update_rollups(conn, args.feedback_dir, args.feedback_dir)
+    print(f"📥 Ingested {ingested} new file(s)")
+    print()
+
+    trends = trend_rollups.summarize_trends(conn, args.granularity, args.kind)
+    print("\n".join(improvement_engine.generate_trend_lines(trends)))
+
+
+def cmd_versions(args):
+    """List a company's memo versions or show the section diff between two of them"""
+    import company_registry
+    import memo_versions
+
+    conn = company_registry.connect(args.db)
+    company_key = company_registry.canonical_company_key(args.company)
+    versions = {v['version']: v for v in memo_versions.list_versions(conn, company_key)}
+    if not versions:
+        print(f"❌ No memo versions recorded for {company_key}")
+        return 1
+
+    if args.action == "list":
+        for v in versions.values():
+            score = f"{v['overall_score']}/10" if v['overall_score'] is not None else "not analyzed"
+            print(f"v{v['version']}  {os.path.basename(v['memo_file'])}  {v['prompt_version'] or ''}  {score}")
+        return
+
+    new = versions.get(args.to or max(versions))
+    old = versions.get(args.from_version or (new['version'] - 1 if new else 0))
+    if not old or not new:
+        print("❌ Need two recorded versions to diff")
+        return 1
+    diff = memo_versions.diff_versions(conn, old, new, include_text=not args.summary)
+    print("\n".join(memo_versions.generate_diff_lines(company_key, old, new, diff)))
+
+
+def cmd_cassette(args):
+    """Show what a record/replay cassette contains"""
+    if not os.path.exists(args.path):
+        print(f"❌ Cassette not found: {args.path}")
+        return 1
+    summary = cassette.cassette_summary(args.path)
+    print(f"📼 {summary['path']}: {summary['file_bytes'] / 1024:.1f} KB on disk, "
+          f"{summary['stored_bytes'] / 1024:.1f} KB compressed interactions")
+    for kind, counts in summary['kinds'].items():
+        print(f"   {kind}: {counts['interactions']} interaction(s), {counts['requests']} distinct request(s)")
+
+
+def cmd_prompts(args):
+    if args.action == "promote":
+        if not args.name or args.version is None:
+            print("❌ Usage: cli.py prompts promote NAME VERSION")
+            return 1
+        try:
+            version = prompt_registry.promote_prompt(args.name, args.version)
+        except (KeyError, ValueError) as e:
+            print(f"❌ {e.args[0] if e.args else e}")
+            return 1
+        print(f"✅ {args.name} now uses v{version}")
+        return
+
+    for item in prompt_registry.list_prompts():
+        aliases = f" ({', '.join(item['aliases'])})" if item['aliases'] else ""
+        print(f"{item['name']} v{item['version']}{aliases} - {item['source']}, {item['created_at']}")
+
+
+def add_streaming_arguments(parser):
+    parser.add_argument("--streaming", action="store_true",
+                        help="Aggregate feedback one file at a time with bounded memory (for large archives)")
+    parser.add_argument("--reservoir-size", type=int, default=improvement_engine.CORRECTION_RESERVOIR_SIZE,
+                        help="Corrections sampled per section in streaming mode")
+
+
+def add_rollup_db_argument(parser):
+    parser.add_argument("--db", default="memo_jobs.db",
+                        help="Trend rollup database, used only if it exists (default: memo_jobs.db)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Deal Memo Quality System")
+    parser.add_argument("--max-cost", type=float, metavar="USD",
+                        help="Per-call cost budget for model routing (default: unlimited)")
+    parser.add_argument("--max-latency", type=float, metavar="SECONDS",
+                        help="Per-call latency budget for model routing (default: unlimited)")
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument("--record", metavar="CASSETTE",
+                           help="Record every API call and website fetch into this cassette file")
+    recording.add_argument("--replay", metavar="CASSETTE",
+                           help="Answer API calls and website fetches from this cassette (offline)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("generate", help="Fetch a company website and generate a deal memo")
+    p.add_argument("url", nargs="?", help="Company website URL (prompted if omitted)")
+    p.add_argument("--prompt-version", help="deal_memo prompt version or alias")
+    p.add_argument("--fresh-hours", type=float, default=7 * 24,
+                   help="Reuse a memo for the same company newer than this (default 168, 0 = always regenerate)")
+    p.set_defaults(func=cmd_generate)
+
+    p = subparsers.add_parser("analyze", help="Analyze a deal memo's quality")
+    p.add_argument("memo_file", help="Path to the deal memo (.md)")
+    p.add_argument("--prompt-version", help="quality_analysis prompt version or alias")
+    p.add_argument("--ensemble", type=int, metavar="N",
+                   help="One Sonnet analysis, widened to a consensus of up to N if it fails its confidence check")
+    p.add_argument("--tolerance", type=float, help="Score spread counted as agreement (ensemble, default 1.0)")
+    p.add_argument("--model", help="Analyzer model (default: Sonnet; ensemble default: Haiku)")
+    p.set_defaults(func=cmd_analyze)
+
+    p = subparsers.add_parser("batch", help="Generate and analyze memos for many companies concurrently")
+    p.add_argument("urls", nargs="*", help="Company website URLs")
+    p.add_argument("--file", help="File with one URL per line")
+    p.add_argument("--concurrency", type=int, default=20, help="Maximum jobs in flight")
+    p.add_argument("--timeout", type=float, default=300, help="Seconds per API call")
+    p.add_argument("--prompt-version", help="deal_memo prompt version or alias")
+    p.add_argument("--no-analyze", action="store_true", help="Skip quality analysis")
+    p.add_argument("--fresh-hours", type=float, default=7 * 24,
+                   help="Reuse a company's artifacts newer than this (default 168, 0 = always regenerate)")
+    p.set_defaults(func=cmd_batch)
+
+    p = subparsers.add_parser("queue", help="Durable job queue: submit URLs, run workers, show stats")
+    p.set_defaults(func=cmd_queue)
+    queue_db = argparse.ArgumentParser(add_help=False)
+    queue_db.add_argument("--db", default="memo_jobs.db", help="Queue database (default: memo_jobs.db)")
+    queue_actions = p.add_subparsers(dest="action", required=True)
+
+    q = queue_actions.add_parser("submit", parents=[queue_db], help="Enqueue companies")
+    q.add_argument("urls", nargs="*", help="Company website URLs")
+    q.add_argument("--file", help="File with one URL per line")
+    q.add_argument("--prompt-version", help="deal_memo prompt version or alias")
+    q.add_argument("--fresh-hours", type=float, default=7 * 24,
+                   help="Reuse a company's artifacts newer than this (default 168, 0 = always regenerate)")
+
+    q = queue_actions.add_parser("work", parents=[queue_db], help="Run a worker pool")
+    q.add_argument("--workers", type=int, default=4, help="Worker processes")
+    q.add_argument("--stages", nargs="+", choices=["fetch", "generate", "analyze"], help="Only run these stages")
+    q.add_argument("--exit-when-idle", action="store_true", help="Stop workers once the queue is empty")
+
+    queue_actions.add_parser("stats", parents=[queue_db], help="Queue depth and throughput per stage")
+    queue_actions.add_parser("dead", parents=[queue_db], help="List dead-lettered jobs")
+
+    q = queue_actions.add_parser("retry", parents=[queue_db], help="Requeue a dead job and its dependents")
+    q.add_argument("job_id", type=int, help="Dead job id (see queue dead)")
+
+    p = subparsers.add_parser("improve", help="Analyze feedback and generate an improved prompt")
+    p.add_argument("--feedback-dir", default=".", help="Directory containing feedback_*.json")
+    add_streaming_arguments(p)
+    add_rollup_db_argument(p)
+    p.set_defaults(func=cmd_improve)
+
+    p = subparsers.add_parser("report", help="Print the text report for an existing _quality.json")
+    p.add_argument("quality_json", help="Path to a *_quality.json file")
+    p.set_defaults(func=cmd_report)
+
+    p = subparsers.add_parser("render", help="Re-render existing _quality.json files (no API calls)")
+    p.add_argument("paths", nargs="*", default=["."], help="Files, directories or glob patterns (default: .)")
+    p.add_argument("--format", default="text", help="Comma-separated: text, markdown, html, csv")
+    p.add_argument("--output-dir", help="Write outputs here instead of next to each JSON file")
+    p.add_argument("--csv-file", help="CSV summary path (default: OUTPUT_DIR/quality_summary.csv)")
+    p.add_argument("--workers", type=int, help="Worker processes (default: CPU count, 1 = no pool)")
+    p.set_defaults(func=cmd_render)
+
+    p = subparsers.add_parser("archive", help="Pack quality reports into compact segments and read them back")
+    p.add_argument("action", choices=["build", "get", "column"])
+    p.add_argument("paths", nargs="*", help="build: _quality.json files/dirs; get/column: segment files/dirs")
+    p.add_argument("--output-dir", default="quality_archive", help="Segment directory (default: quality_archive)")
+    p.add_argument("--segment-size", type=int, default=5000, help="Reports per segment file")
+    p.add_argument("--key", help="Memo file name to fetch (get)")
+    p.add_argument("--column", help="Column to scan, e.g. business_model or red_flags (column)")
+    p.add_argument("--json", action="store_true", help="Print the raw JSON report (get)")
+    p.set_defaults(func=cmd_archive)
+
+    p = subparsers.add_parser("patterns", help="Print the feedback pattern report (no API calls)")
+    p.add_argument("--feedback-dir", default=".", help="Directory containing feedback_*.json")
+    add_streaming_arguments(p)
+    add_rollup_db_argument(p)
+    p.set_defaults(func=cmd_patterns)
+
+    p = subparsers.add_parser("trends", help="Section trends, drift and prompt-version comparison (no API calls)")
+    p.add_argument("--feedback-dir", default=".", help="Directory containing feedback_*.json and *_quality.json")
+    p.add_argument("--granularity", choices=["day", "week"], default="week")
+    p.add_argument("--kind", choices=["feedback", "quality"], default="feedback",
+                   help="Human feedback ratings or analyzer completeness/scores")
+    p.add_argument("--db", default="memo_jobs.db", help="Rollup database (default: memo_jobs.db)")
+    p.add_argument("--rebuild", action="store_true", help="Recompute rollups from all files")
+    p.set_defaults(func=cmd_trends)
+
+    p = subparsers.add_parser("versions", help="Memo versions per company and section-level diffs (no API calls)")
+    p.add_argument("action", choices=["list", "diff"])
+    p.add_argument("company", help="Company URL or domain")
+    p.add_argument("--from", dest="from_version", type=int, help="Older version (diff, default: previous)")
+    p.add_argument("--to", type=int, help="Newer version (diff, default: latest)")
+    p.add_argument("--summary", action="store_true", help="Only section status and scores, no paragraphs (diff)")
+    p.add_argument("--db", default="memo_jobs.db", help="Registry database (default: memo_jobs.db)")
+    p.set_defaults(func=cmd_versions)
+
+    p = subparsers.add_parser("cassette", help="Summarize a record/replay cassette (no API calls)")
+    p.add_argument("path", help="Cassette file written with --record")
+    p.set_defaults(func=cmd_cassette)
+
+    p = subparsers.add_parser("prompts", help="List or promote prompt versions")
+    p.add_argument("action", nargs="?", choices=["list", "promote"], default="list")
+    p.add_argument("name", nargs="?", help="Prompt name (for promote)")
+    p.add_argument("version", nargs="?", help="Version number or alias (for promote)")
+    p.set_defaults(func=cmd_prompts)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    model_router.set_budget(args.max_cost, args.max_latency)
+    if args.record or args.replay:
+        cassette.use_cassette(args.record or args.replay, "record" if args.record else "replay")
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Company Registry
+Canonical company keys and the latest fetch, memo and quality report per company
+
+stripe.com, https://www.stripe.com/ and stripe.com/pricing all map to the
+key "stripe.com" (after following redirects), so repeat submissions within
+the freshness window reuse the existing artifacts instead of regenerating.
+"""
+
+import os
+import json
+import time
+from urllib.parse import urlsplit
+
+import memo_versions
+from registry_db import DEFAULT_DB_PATH, connect
+
+DEFAULT_FRESHNESS_SECONDS = 7 * 24 * 3600
+ALIAS_TTL_SECONDS = 30 * 24 * 3600
+RESOLVE_TIMEOUT = 10
+
+
+def connect_existing(db_path=DEFAULT_DB_PATH):
+    """
+    Open the registry only if it already exists (else None), so single generate/analyze runs
+    don't create it; batch and queue runs create it
+    """
+    return connect(db_path) if os.path.exists(db_path) else None
+
+
+def canonical_company_key(url):
+    """Normalize a URL to its host: lowercase, no scheme, www., port, path or trailing dot"""
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    host = (urlsplit(url).hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def company_slug(url):
+    """File-name friendly company name, e.g. https://www.stripe.com/pricing -> stripe"""
+    return canonical_company_key(url).replace('.com', '').replace('.', '_')
+
+
+def follow_redirects(url, timeout=RESOLVE_TIMEOUT):
+    """Return the final URL after redirects (the input URL if the site can't be reached)"""
+    import cassette
+
+    def head():
+        import requests
+
+        response = requests.head(url, allow_redirects=True, timeout=timeout,
+                                 headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+        return response.url
+
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        return cassette.call('http', {'method': 'HEAD', 'url': url}, head)
+    except cassette.CassetteMiss:
+        raise
+    except Exception:
+        return url
+
+
+def cached_company_key(conn, url):
+    """Canonical key from a previous redirect lookup, or None if unknown or expired"""
+    row = conn.execute(
+        "SELECT company_key, resolved_at FROM company_aliases WHERE input_key = ?", (canonical_company_key(url),)
+    ).fetchone()
+    if row and time.time() - row['resolved_at'] < ALIAS_TTL_SECONDS:
+        return row['company_key']
+    return None
+
+
+def remember_alias(conn, url, final_url):
+    """Record where a submitted URL redirects to and return its canonical key"""
+    input_key = canonical_company_key(url)
+    company_key = canonical_company_key(final_url) or input_key
+    conn.execute(
+        "INSERT INTO company_aliases (input_key, company_key, resolved_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(input_key) DO UPDATE SET company_key = excluded.company_key, resolved_at = excluded.resolved_at",
+        (input_key, company_key, time.time())
+    )
+    return company_key
+
+
+def resolve_company_key(conn, url, resolve_redirects=True):
+    """Canonical key for a submitted URL, following redirects once per alias TTL"""
+    if not resolve_redirects:
+        return canonical_company_key(url)
+    return cached_company_key(conn, url) or remember_alias(conn, url, follow_redirects(url))
+
+
+def get_company(conn, company_key):
+    row = conn.execute("SELECT * FROM companies WHERE company_key = ?", (company_key,)).fetchone()
+    return dict(row) if row else None
+
+
+def fresh_artifacts(conn, company_key, freshness_seconds=DEFAULT_FRESHNESS_SECONDS, stage="analyze",
+                    prompt_label=None):
+    """
+    Return the company's registry entry if its artifacts up to `stage` are newer than the window
+    (and, when prompt_label is given, were generated with that prompt); otherwise None
+    """
+    if not freshness_seconds:
+        return None
+    company = get_company(conn, company_key)
+    if company is None:
+        return None
+
+    cutoff = time.time() - freshness_seconds
+    if stage == "fetch":
+        return company if (company['fetched_at'] or 0) >= cutoff else None
+
+    if (company['memo_at'] or 0) < cutoff or not company['memo_file'] or not os.path.exists(company['memo_file']):
+        return None
+    if prompt_label and company['prompt_version'] != prompt_label:
+        return None
+    if stage == "generate":
+        return company
+
+    if (company['analyzed_at'] or 0) < cutoff or not company['quality_json'] or not os.path.exists(company['quality_json']):
+        return None
+    return company
+
+
+def _upsert(conn, company_key, url, **fields):
+    columns = ", ".join(fields)
+    placeholders = ", ".join("?" for _ in fields)
+    updates = ", ".join(f"{name} = excluded.{name}" for name in fields)
+    conn.execute(
+        f"INSERT INTO companies (company_key, url, {columns}) VALUES (?, ?, {placeholders}) "
+        f"ON CONFLICT(company_key) DO UPDATE SET url = excluded.url, {updates}",
+        [company_key, url] + list(fields.values())
+    )
+
+
+def record_fetch(conn, company_key, url, company_data):
+    _upsert(conn, company_key, url, company_data=json.dumps(company_data), fetched_at=time.time())
+
+
+def record_memo(conn, company_key, url, memo_file, prompt_label):
+    """Point the company at its new memo and keep the memo as the company's next version"""
+    # Memo files are stored as absolute paths, so ./x.md and x.md are the same memo
+    memo_file = os.path.abspath(memo_file)
+    # A new memo invalidates the previous memo's quality report
+    _upsert(conn, company_key, url, memo_file=memo_file, prompt_version=prompt_label, memo_at=time.time(),
+            quality_json=None, overall_score=None, analyzed_at=None)
+    memo_versions.record_version(conn, company_key, memo_file, prompt_label)
+
+
+def record_quality(conn, memo_file, quality_json, overall_score):
+    """Attach a quality report to whichever company (and memo version) the memo belongs to"""
+    conn.execute(
+        "UPDATE companies SET quality_json = ?, overall_score = ?, analyzed_at = ? WHERE memo_file = ?",
+        (os.path.abspath(quality_json), overall_score, time.time(), os.path.abspath(memo_file))
+    )
+    memo_versions.link_quality(conn, memo_file, quality_json, overall_score)
@@ -4,44 +4,99 @@ A tool to analyze startups and generate structured investment memos
 Built for Primary VC - PrimaryOS Operations
 """
 
-import os
-import requests
-from bs4 import BeautifulSoup
 import json
 from datetime import datetime
-import anthropic
+from prompt_registry import get_prompt
+from llm_client import DEFAULT_TIMEOUT
+from model_router import complete_routed, complete_routed_async, routing_summary
+import cassette
+import company_registry
+from company_registry import company_slug
+
+# requests, bs4 and httpx are imported inside the functions that use them
+# so that offline commands (report rendering, prompt listing) start fast.
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+FETCH_TIMEOUT = 10
+
+# A fast-tier memo missing more than two of these is regenerated on the larger model
+MEMO_SECTION_TITLES = ["executive summary", "company overview", "market", "product",
+                       "business model", "competitive", "risk", "investment thesis"]
+MEMO_MIN_CHARS = 1500
+
+def parse_website_content(url, html):
+    """Extract title, meta description and visible text from a fetched page"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style", "nav", "footer"]):
+        script.decompose()
+    
+    # Get text content
+    text = soup.get_text(separator=' ', strip=True)
+    
+    # Get meta description
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    description = meta_desc['content'] if meta_desc else ""
+    
+    # Get title
+    title = soup.title.string if soup.title else ""
+    
+    return {
+        'url': url,
+        'title': title,
+        'description': description,
+        'content': text[:8000]  # Limit content length
+    }
 
 def fetch_website_content(url):
     """Fetch and parse website content"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+    def get():
+        import requests
+
+        response = requests.get(url, headers=REQUEST_HEADERS, timeout=FETCH_TIMEOUT)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text(separator=' ', strip=True)
-        
-        # Get meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        description = meta_desc['content'] if meta_desc else ""
-        
-        # Get title
-        title = soup.title.string if soup.title else ""
-        
+        return response.content
+
+    try:
+        html = cassette.call('http', {'method': 'GET', 'url': url}, get)
+        return parse_website_content(url, html)
+    except cassette.CassetteMiss:
+        # A stale cassette must fail the replay, not turn into "could not fetch" content
+        raise
+    except Exception as e:
         return {
             'url': url,
-            'title': title,
-            'description': description,
-            'content': text[:8000]  # Limit content length
+            'error': str(e),
+            'content': ''
         }
+
+async def fetch_website_content_async(url, http_client=None, timeout=FETCH_TIMEOUT):
+    """
+    Async counterpart of fetch_website_content
+    Pass a shared httpx.AsyncClient when fetching many sites; HTML parsing runs in a worker thread
+    """
+    import asyncio
+    import httpx
+
+    async def get():
+        if http_client is None:
+            async with httpx.AsyncClient(follow_redirects=True) as client:
+                response = await client.get(url, headers=REQUEST_HEADERS, timeout=timeout)
+        else:
+            response = await http_client.get(url, headers=REQUEST_HEADERS, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    try:
+        html = await cassette.call_async('http', {'method': 'GET', 'url': url}, get)
+        return await asyncio.to_thread(parse_website_content, url, html)
+    except cassette.CassetteMiss:
+        raise
     except Exception as e:
         return {
             'url': url,
@@ -49,92 +104,61 @@ def fetch_website_content(url):
             'content': ''
         }
 
-def generate_deal_memo(company_data):
-    """Generate a structured VC deal memo using Claude"""
-    
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-    
-    prompt = f"""You are a venture capital analyst at Primary, a seed-stage VC firm focused on transformational businesses. 
-
-Analyze the following company information and generate a comprehensive investment memo.
-
-Company URL: {company_data['url']}
-Company Name: {company_data.get('title', 'Unknown')}
-Description: {company_data.get('description', 'N/A')}
-
-Website Content:
-{company_data['content']}
-
-Generate a structured investment memo with the following sections:
-
-1. EXECUTIVE SUMMARY (2-3 sentences)
-   - Quick snapshot of what the company does and why it matters
-
-2. COMPANY OVERVIEW
-   - What problem are they solving?
-   - What is their solution?
-   - Current stage and traction (if mentioned)
-
-3. MARKET ANALYSIS
-   - Market size and opportunity
-   - Market trends and dynamics
-   - Why now?
-
-4. PRODUCT & TECHNOLOGY
-   - Core product/service
-   - Key differentiators
-   - Technical moat (if any)
-
-5. BUSINESS MODEL
-   - How they make money
-   - Unit economics (if available)
-   - Go-to-market strategy
-
-6. COMPETITIVE LANDSCAPE
-   - Key competitors
-   - Competitive advantages
-   - Market positioning
-
-7. RISKS & CONSIDERATIONS
-   - Market risks
-   - Execution risks
-   - Competition risks
-
-8. INVESTMENT THESIS
-   - Why this could be a transformational business
-   - Alignment with Primary's thesis
-   - Key success factors
-
-Be analytical, balanced, and specific. Use bullet points within sections for clarity. If information is not available from the website, note it as "[Information not available from public sources]"."""
-
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4000,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+def build_deal_memo_prompt(company_data, prompt_version=None):
+    """Fill the deal memo prompt (version or alias from the registry) with company data"""
+    return get_prompt('deal_memo', prompt_version).render(
+        url=company_data['url'],
+        title=company_data.get('title', 'Unknown'),
+        description=company_data.get('description', 'N/A'),
+        content=company_data['content']
     )
-    
-    return message.content[0].text
 
-def save_memo(company_url, memo_content):
+def validate_memo(memo):
+    """None if the memo looks complete, else why it should be regenerated on a larger model"""
+    if len(memo) < MEMO_MIN_CHARS:
+        return f"memo only {len(memo)} characters"
+    lowered = memo.lower()
+    missing = [title for title in MEMO_SECTION_TITLES if title not in lowered]
+    if len(missing) > 2:
+        return f"missing sections: {', '.join(missing)}"
+    return None
+
+def generate_deal_memo(company_data, prompt_version=None):
+    """Generate a structured VC deal memo using Claude (prompt version or alias from the registry)"""
+    return complete_routed('deal_memo', build_deal_memo_prompt(company_data, prompt_version), validate_memo)
+
+async def generate_deal_memo_async(company_data, prompt_version=None, client=None, timeout=DEFAULT_TIMEOUT):
+    """Async counterpart of generate_deal_memo; pass a shared AsyncAnthropic client for concurrent jobs"""
+    prompt = build_deal_memo_prompt(company_data, prompt_version)
+    return await complete_routed_async('deal_memo', prompt, validate_memo, client=client, timeout=timeout)
+
+def save_memo(company_url, memo_content, prompt_version=None):
     """Save the memo to a file"""
+    prompt = get_prompt('deal_memo', prompt_version)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    company_name = company_url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].replace('.com', '').replace('.', '_')
+    company_name = company_slug(company_url)
     
-    filename = f"deal_memo_{company_name}_{timestamp}.md"
     # Save in current directory instead of /mnt/user-data/outputs/
-    filepath = filename
-    
-    with open(filepath, 'w') as f:
+    # Exclusive create: a concurrent run for the same company in the same second gets _2, _3, ...
+    attempt = 1
+    while True:
+        filepath = f"deal_memo_{company_name}_{timestamp}{f'_{attempt}' if attempt > 1 else ''}.md"
+        try:
+            f = open(filepath, 'x')
+            break
+        except FileExistsError:
+            attempt += 1
+
+    with f:
         f.write(f"# Investment Memo: {company_url}\n\n")
         f.write(f"*Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}*\n\n")
+        f.write(f"*Prompt: {prompt.label}*\n\n")
         f.write("---\n\n")
         f.write(memo_content)
     
     return filepath
 
-def main():
+def main(company_url=None, prompt_version=None, freshness_seconds=company_registry.DEFAULT_FRESHNESS_SECONDS):
     print("=" * 60)
     print("VC DEAL MEMO GENERATOR")
     print("Built for Primary VC - PrimaryOS Operations")
@@ -142,11 +166,28 @@ def main():
     print()
     
     # Get company URL
-    company_url = input("Enter company website URL: ").strip()
+    if not company_url:
+        company_url = input("Enter company website URL: ").strip()
     
     if not company_url.startswith('http'):
         company_url = 'https://' + company_url
     
+    # Reuse a recent memo for the same company instead of regenerating it
+    # (only when a registry already exists, e.g. from batch or queue runs)
+    registry = company_registry.connect_existing()
+    prompt_label = get_prompt('deal_memo', prompt_version).label
+    existing = None
+    if registry is not None:
+        company_key = company_registry.resolve_company_key(registry, company_url)
+        existing = company_registry.fresh_artifacts(registry, company_key, freshness_seconds, "generate", prompt_label)
+    if existing:
+        print(f"\n♻️  {company_key} already has a memo from {datetime.fromtimestamp(existing['memo_at']).strftime('%B %d, %Y at %I:%M %p')}")
+        print(f"📄 {existing['memo_file']}")
+        if existing['quality_json']:
+            print(f"📊 {existing['quality_json']}")
+        print("\n" + "=" * 60)
+        return existing['memo_file']
+    
     print(f"\n📊 Analyzing {company_url}...")
     print("Step 1/3: Fetching website content...")
     
@@ -156,20 +197,27 @@ def main():
     if 'error' in company_data and company_data['content'] == '':
         print(f"❌ Error fetching website: {company_data['error']}")
         return
+    if registry is not None:
+        company_registry.record_fetch(registry, company_key, company_url, company_data)
     
     print("Step 2/3: Generating investment memo with AI analysis...")
     
     # Generate memo
-    memo = generate_deal_memo(company_data)
+    memo = generate_deal_memo(company_data, prompt_version)
     
     print("Step 3/3: Saving memo...")
     
     # Save memo
-    filepath = save_memo(company_url, memo)
+    filepath = save_memo(company_url, memo, prompt_version)
+    if registry is not None:
+        company_registry.record_memo(registry, company_key, company_url, filepath, prompt_label)
     
     print(f"\n✅ Deal memo generated successfully!")
     print(f"📄 Saved to: {filepath}")
+    if routing_summary():
+        print(routing_summary())
     print("\n" + "=" * 60)
+    return filepath
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
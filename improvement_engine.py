@@ -5,10 +5,16 @@ Analyzes feedback patterns and generates improved prompts for better deal memos
 
 import os
 import json
-import anthropic
+from prompt_registry import get_prompt, register_prompt, validate_template
+from llm_client import DEFAULT_TIMEOUT
+from model_router import complete_routed, complete_routed_async, routing_summary
 from datetime import datetime
 from collections import defaultdict
 import glob
+import random
+import sys
+
+CORRECTION_RESERVOIR_SIZE = 20  # corrections kept per section in streaming mode
 
 def load_feedback_files(feedback_dir="."):
     """Load all feedback JSON files from directory"""
@@ -29,32 +35,80 @@ def load_feedback_files(feedback_dir="."):
 
     return feedback_data
 
-def analyze_feedback_patterns(feedback_data):
-    """Analyze patterns across multiple feedback sessions"""
-
-    if not feedback_data:
-        return None
+def iter_feedback_files(feedback_dir="."):
+    """Yield feedback JSON files one at a time, so only one is in memory at once"""
+    for filepath in glob.iglob(f"{feedback_dir}/feedback_*.json"):
+        with open(filepath, 'r') as f:
+            yield {
+                'filepath': filepath,
+                'data': json.load(f)
+            }
+
+def add_to_reservoir(reservoir, item, size, rng):
+    """Keep a uniform random sample of at most `size` items from a stream (Algorithm R)"""
+    reservoir['seen'] += 1
+    if len(reservoir['sample']) < size:
+        reservoir['sample'].append(item)
+    else:
+        slot = rng.randrange(reservoir['seen'])
+        if slot < size:
+            reservoir['sample'][slot] = item
+
+def analyze_feedback_patterns(feedback_data, streaming=False, reservoir_size=CORRECTION_RESERVOIR_SIZE):
+    """
+    Analyze patterns across multiple feedback sessions
+    feedback_data may be a list or an iterator (see iter_feedback_files). With streaming=True,
+    memory stays bounded: corrections on needs_work/wrong sections are kept as a reservoir
+    sample of reservoir_size per section and the per-file score trend is not retained (only its average)
+    """
 
     analysis = {
-        'total_memos_reviewed': len(feedback_data),
+        'total_memos_reviewed': 0,
         'section_ratings': defaultdict(lambda: {'good': 0, 'needs_work': 0, 'wrong': 0, 'total': 0}),
         'common_issues': defaultdict(int),
         'quality_score_trend': [],
         'problematic_sections': [],
-        'frequent_corrections': []
+        'frequent_corrections': [],
+        'versioned_memos': 0,
+        'section_changes': defaultdict(lambda: {'changed': 0, 'unchanged': 0, 'not_rereviewed': 0,
+                                                'changed_delta': 0.0, 'changed_scored': 0,
+                                                'unchanged_delta': 0.0, 'unchanged_scored': 0})
     }
 
     all_corrections = []
+    correction_reservoirs = defaultdict(lambda: {'seen': 0, 'sample': []})
+    rng = random.Random(0)
+    score_sum = 0
+    score_count = 0
 
     for feedback_item in feedback_data:
         data = feedback_item['data']
+        analysis['total_memos_reviewed'] += 1
 
-        # Track quality scores
+        # Track quality scores (with the time they were reviewed, for ordering)
         if 'overall_quality_score' in data:
-            analysis['quality_score_trend'].append(data['overall_quality_score'])
+            score_sum += data['overall_quality_score']
+            score_count += 1
+            if not streaming:
+                reviewed_at = data.get('exported_at') or data.get('memo_metadata', {}).get('analyzed_at') or ""
+                analysis['quality_score_trend'].append((reviewed_at, data['overall_quality_score']))
 
         # Analyze section feedback
         section_feedback = data.get('section_feedback', {})
+
+        # Which section edits (since the previous memo version) moved which scores
+        memo_changes = (data.get('memo_metadata') or {}).get('memo_changes')
+        if memo_changes:
+            analysis['versioned_memos'] += 1
+            for section_id, change in memo_changes['sections'].items():
+                tally = analysis['section_changes'][section_id]
+                kind = 'unchanged' if change['status'] == 'unchanged' else 'changed'
+                tally[kind] += 1
+                if kind == 'changed' and not section_feedback.get(section_id, {}).get('rating'):
+                    tally['not_rereviewed'] += 1
+                if change.get('score') is not None and change.get('previous_score') is not None:
+                    tally[f'{kind}_delta'] += change['score'] - change['previous_score']
+                    tally[f'{kind}_scored'] += 1
         for section_id, feedback in section_feedback.items():
             rating = feedback.get('rating')
             if rating:
@@ -67,11 +121,20 @@ def analyze_feedback_patterns(feedback_data):
             # Collect corrections
             correction = feedback.get('correction', '').strip()
             if correction:
-                all_corrections.append({
+                item = {
                     'section': section_id,
                     'correction': correction,
                     'rating': rating
-                })
+                }
+                if streaming:
+                    # Only problem corrections feed the prompt; don't spend the sample on the rest
+                    if rating in ['needs_work', 'wrong']:
+                        add_to_reservoir(correction_reservoirs[section_id], item, reservoir_size, rng)
+                else:
+                    all_corrections.append(item)
+
+    if analysis['total_memos_reviewed'] == 0:
+        return None
 
     # Identify problematic sections (high needs_work or wrong ratings)
     for section_id, ratings in analysis['section_ratings'].items():
@@ -90,14 +153,39 @@ def analyze_feedback_patterns(feedback_data):
     analysis['problematic_sections'].sort(key=lambda x: x['problem_rate'], reverse=True)
 
     # Store corrections for prompt improvement
+    if streaming:
+        all_corrections = [item for reservoir in correction_reservoirs.values() for item in reservoir['sample']]
+        analysis['corrections_seen'] = {section: r['seen'] for section, r in correction_reservoirs.items()}
     analysis['all_corrections'] = all_corrections
 
+    # Order scores chronologically rather than by file glob order
+    analysis['quality_score_trend'] = [score for _, score in sorted(analysis['quality_score_trend'], key=lambda x: x[0])]
+
     # Calculate average quality score
-    if analysis['quality_score_trend']:
-        analysis['avg_quality_score'] = sum(analysis['quality_score_trend']) / len(analysis['quality_score_trend'])
+    if score_count:
+        analysis['avg_quality_score'] = score_sum / score_count
 
     return analysis
 
+def peak_memory_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def print_streaming_summary(analysis):
+    """Print how much was streamed and sampled, plus peak memory"""
+    print(f"✅ Streamed {analysis['total_memos_reviewed']} feedback file(s), "
+          f"kept {len(analysis['all_corrections'])} of {sum(analysis['corrections_seen'].values())} problem corrections")
+    peak_mb = peak_memory_mb()
+    if peak_mb is not None:
+        print(f"🧠 Peak memory (RSS): {peak_mb:.1f} MB")
+    print()
+
 def generate_pattern_report(analysis):
     """Generate human-readable pattern analysis report"""
 
@@ -147,14 +235,90 @@ def generate_pattern_report(analysis):
             report.append(f"  ✅ Good: {good_pct:.0f}%  |  ⚠️ Needs Work: {needs_pct:.0f}%  |  ❌ Wrong: {wrong_pct:.0f}%")
             report.append("")
 
+    if analysis.get('versioned_memos'):
+        report.extend(generate_section_change_lines(analysis))
+
+    if analysis.get('trends'):
+        report.extend(generate_trend_lines(analysis['trends']))
+
     report.append("=" * 80)
 
     return "\n".join(report)
 
-def generate_improved_prompt(analysis, original_prompt):
-    """Use Claude to generate an improved prompt based on feedback patterns"""
+def generate_section_change_lines(analysis):
+    """Report lines linking section edits between memo versions to score changes"""
+    lines = []
+    lines.append("-" * 80)
+    lines.append(f"✎ SECTION EDITS SINCE PREVIOUS MEMO VERSION ({analysis['versioned_memos']} regenerated memos)")
+    lines.append("-" * 80)
+    lines.append("")
+
+    def average(total, count):
+        return f"{total / count:+.1f}" if count else "n/a"
+
+    rereview = []
+    for section_id, tally in sorted(analysis['section_changes'].items(), key=lambda x: -x[1]['changed']):
+        section_name = section_id.replace('_', ' ').title()
+        seen = tally['changed'] + tally['unchanged']
+        lines.append(f"{section_name}: edited in {tally['changed']}/{seen}  |  "
+                     f"score change when edited {average(tally['changed_delta'], tally['changed_scored'])}, "
+                     f"when unchanged {average(tally['unchanged_delta'], tally['unchanged_scored'])}")
+        if tally['not_rereviewed']:
+            rereview.append(f"{section_name} ({tally['not_rereviewed']})")
+    lines.append("")
+    if rereview:
+        lines.append(f"🔁 Edited sections without feedback yet: {', '.join(rereview)}")
+        lines.append("")
+    return lines
+
+def generate_trend_lines(trends):
+    """Trend section of the pattern report, from trend_rollups.summarize_trends"""
+
+    lines = []
+    lines.append("-" * 80)
+    period = {'day': "DAILY", 'week': "WEEKLY"}[trends['granularity']]
+    lines.append(f"📈 TRENDS ({period}, {trends['kind']})")
+    lines.append("-" * 80)
+    lines.append("")
+
+    if trends['overall']:
+        lines.append("Average Quality Score:")
+        lines.append("  " + "  →  ".join(
+            f"{bucket} {score:.1f}" for bucket, _, _, score in trends['overall'] if score is not None
+        ))
+        lines.append("")
+
+    lines.append("Section Problem Rate:")
+    for section_id, points in sorted(trends['sections'].items()):
+        section_name = section_id.replace('_', ' ').title()
+        lines.append(f"  {section_name}: " + "  →  ".join(
+            f"{bucket} {problems / total * 100:.0f}% ({total})" for bucket, problems, total, _ in points if total
+        ))
+    lines.append("")
+
+    lines.append("Drift / Change Points:")
+    if trends['drift']:
+        for change in trends['drift']:
+            icon = "🔴" if change['direction'] == 'worsened' else "🟢"
+            lines.append(f"  {icon} {change['section'].replace('_', ' ').title()} {change['direction']} "
+                         f"from {change['bucket']}: {change['rate_before'] * 100:.0f}% → {change['rate_after'] * 100:.0f}% "
+                         f"problematic (z={change['z']:.1f}, {change['reviews_before']} vs {change['reviews_after']} reviews)")
+    else:
+        lines.append("  No significant shifts in section problem rates")
+    lines.append("")
+
+    if trends['prompt_versions']:
+        lines.append("By Prompt Version:")
+        for version, summary in sorted(trends['prompt_versions'].items()):
+            rate = summary['problems'] / summary['total'] * 100 if summary['total'] else 0
+            score = f"{summary['avg_score']:.1f}/10" if summary['avg_score'] is not None else "n/a"
+            lines.append(f"  {version}: {rate:.0f}% problematic ({summary['total']} section reviews), avg score {score}")
+        lines.append("")
 
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    return lines
+
+def build_improvement_prompt(analysis, original_prompt):
+    """Summarize feedback patterns into the prompt-improvement request"""
 
     # Prepare feedback summary for Claude
     problematic_sections_summary = "\n".join([
@@ -176,61 +340,36 @@ def generate_improved_prompt(analysis, original_prompt):
         for correction in corrections[:3]:  # Max 3 corrections per section
             corrections_summary += f"  - {correction}\n"
 
-    improvement_prompt = f"""You are a prompt engineering expert helping improve an AI system that generates VC investment memos.
-
-CURRENT SITUATION:
-We've analyzed feedback from {analysis['total_memos_reviewed']} generated memos with an average quality score of {analysis.get('avg_quality_score', 0):.1f}/10.
-
-ORIGINAL PROMPT:
-{original_prompt}
-
-FEEDBACK ANALYSIS:
-
-Most Problematic Sections:
-{problematic_sections_summary}
-
-Common User Corrections:
-{corrections_summary}
-
-TASK:
-Generate an improved version of the prompt that addresses these specific issues:
-
-1. For each problematic section, add specific instructions that would prevent the identified issues
-2. Add concrete examples of what good output looks like for weak sections
-3. Include explicit requirements for data sourcing and quantitative backing
-4. Add instructions to avoid generic language and require specific insights
-5. Ensure the prompt guides toward producing actionable investment memos, not just research reports
-
-Requirements for the improved prompt:
-- Maintain the same overall structure and sections
-- Add 2-3 specific improvement instructions per problematic section
-- Include quality checkpoints (e.g., "Ensure you include at least 3 sourced data points")
-- Add examples of good vs. bad output for the worst sections
-- Make instructions more actionable and measurable
-
-Return your response in this exact format:
-
-IMPROVED PROMPT:
-[The complete improved prompt here]
-
-KEY IMPROVEMENTS MADE:
-1. [First improvement and why]
-2. [Second improvement and why]
-3. [Third improvement and why]
-[etc.]
+    return get_prompt('prompt_improvement').render(
+        total_memos_reviewed=analysis['total_memos_reviewed'],
+        avg_quality_score=analysis.get('avg_quality_score', 0),
+        original_prompt=original_prompt,
+        problematic_sections_summary=problematic_sections_summary,
+        corrections_summary=corrections_summary
+    )
 
-EXPECTED IMPACT:
-[Brief explanation of how these changes should improve memo quality]"""
+def validate_improvement_response(response_text):
+    """None if save_improvement_report can use the response, else why it should be retried on a larger model"""
+    for marker in ("IMPROVED PROMPT:", "KEY IMPROVEMENTS MADE:", "EXPECTED IMPACT:"):
+        if marker not in response_text:
+            return f"missing {marker}"
+    improved_section = response_text.split("IMPROVED PROMPT:")[1].split("KEY IMPROVEMENTS MADE:")[0].strip()
+    try:
+        validate_template('deal_memo', improved_section)
+    except ValueError as e:
+        return f"invalid template: {e}"
+    return None
 
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=6000,
-        messages=[
-            {"role": "user", "content": improvement_prompt}
-        ]
-    )
+def generate_improved_prompt(analysis, original_prompt):
+    """Use Claude to generate an improved prompt based on feedback patterns"""
+    return complete_routed('prompt_improvement', build_improvement_prompt(analysis, original_prompt),
+                           validate_improvement_response)
 
-    return message.content[0].text
+async def generate_improved_prompt_async(analysis, original_prompt, client=None, timeout=DEFAULT_TIMEOUT):
+    """Async counterpart of generate_improved_prompt"""
+    prompt = build_improvement_prompt(analysis, original_prompt)
+    return await complete_routed_async('prompt_improvement', prompt, validate_improvement_response,
+                                       client=client, timeout=timeout)
 
 def save_improvement_report(analysis, improved_prompt_response, original_prompt):
     """Save improvement analysis and new prompt"""
@@ -289,6 +428,16 @@ def save_improvement_report(analysis, improved_prompt_response, original_prompt)
     with open(prompt_filepath, 'w') as f:
         f.write(improved_section)
 
+    # Register as a candidate; promoting it is a registry write, not a code edit
+    try:
+        candidate_version = register_prompt(
+            'deal_memo', improved_section, alias='candidate',
+            source=comparison_filepath, notes=f"Generated from {analysis['total_memos_reviewed']} reviewed memos"
+        )
+    except ValueError as e:
+        print(f"⚠️  Improved prompt is not a valid template, not registered: {e}")
+        candidate_version = None
+
     # Save full data as JSON
     json_filepath = f"improvement_data_{timestamp}.json"
     with open(json_filepath, 'w') as f:
@@ -298,10 +447,12 @@ def save_improvement_report(analysis, improved_prompt_response, original_prompt)
                 'total_memos': analysis['total_memos_reviewed'],
                 'avg_quality_score': analysis.get('avg_quality_score', 0),
                 'problematic_sections': analysis['problematic_sections'],
-                'section_ratings': dict(analysis['section_ratings'])
+                'section_ratings': dict(analysis['section_ratings']),
+                'section_changes': dict(analysis.get('section_changes', {}))
             },
             'original_prompt': original_prompt,
             'improved_prompt': improved_section,
+            'improved_prompt_version': candidate_version,
             'improvements_list': improvements,
             'expected_impact': expected_impact
         }, f, indent=2)
@@ -310,10 +461,29 @@ def save_improvement_report(analysis, improved_prompt_response, original_prompt)
         'pattern_report': pattern_filepath,
         'comparison_report': comparison_filepath,
         'improved_prompt': prompt_filepath,
+        'improved_prompt_version': candidate_version,
         'json_data': json_filepath
     }
 
-def main():
+def load_trends(feedback_dir=".", granularity="week", db_path=None):
+    """
+    Fold new feedback/quality files into the rollups and summarize trends from them
+    Returns None if the rollup database doesn't exist yet (the trends command creates it),
+    so pattern reports never create it as a side effect
+    """
+    import trend_rollups
+
+    db_path = db_path or trend_rollups.DEFAULT_DB_PATH
+    if not os.path.exists(db_path):
+        return None
+    conn = trend_rollups.connect(db_path)
+    try:
+        trend_rollups.update_rollups(conn, feedback_dir, feedback_dir)
+        return trend_rollups.summarize_trends(conn, granularity)
+    finally:
+        conn.close()
+
+def main(feedback_dir=".", streaming=False, reservoir_size=CORRECTION_RESERVOIR_SIZE, db_path=None):
     """Main function to run improvement engine"""
 
     print("=" * 80)
@@ -322,37 +492,43 @@ def main():
     print("=" * 80)
     print()
 
-    # Load feedback files
-    print("📂 Loading feedback files...")
-    feedback_data = load_feedback_files()
-
-    if not feedback_data:
+    if streaming:
+        # Files are parsed and aggregated one at a time; memory stays flat as the archive grows
+        print("📂 Streaming feedback files...")
+        print("🔍 Analyzing feedback patterns...")
+        analysis = analyze_feedback_patterns(iter_feedback_files(feedback_dir), streaming=True,
+                                             reservoir_size=reservoir_size)
+    else:
+        # Load feedback files
+        print("📂 Loading feedback files...")
+        feedback_data = load_feedback_files(feedback_dir)
+        if feedback_data:
+            print(f"✅ Loaded {len(feedback_data)} feedback file(s)")
+            print()
+
+        # Analyze patterns
+        print("🔍 Analyzing feedback patterns...")
+        analysis = analyze_feedback_patterns(feedback_data)
+
+    if not analysis:
         print("\n❌ No feedback files found!")
         print("Please run the feedback interface and export feedback first.")
         return
 
-    print(f"✅ Loaded {len(feedback_data)} feedback file(s)")
-    print()
-
-    # Analyze patterns
-    print("🔍 Analyzing feedback patterns...")
-    analysis = analyze_feedback_patterns(feedback_data)
+    if streaming:
+        print_streaming_summary(analysis)
+    analysis['trends'] = load_trends(feedback_dir, db_path=db_path)
 
     # Show pattern report
     pattern_report = generate_pattern_report(analysis)
     print(pattern_report)
     print()
 
-    # Get original prompt from deal_memo_generator.py
-    print("📄 Reading original prompt from deal_memo_generator.py...")
-    with open('deal_memo_generator.py', 'r') as f:
-        content = f.read()
-        # Extract prompt from generate_deal_memo function
-        prompt_start = content.find('prompt = f"""')
-        prompt_end = content.find('"""', prompt_start + 13)
-        original_prompt = content[prompt_start + 13:prompt_end].strip()
+    # Get the current deal memo prompt from the registry
+    current_prompt = get_prompt('deal_memo')
+    original_prompt = current_prompt.template
 
-    print("✅ Original prompt extracted")
+    print(f"✅ Current prompt: {current_prompt.label}")
     print()
 
     # Generate improved prompt
@@ -374,7 +550,14 @@ def main():
     print(f"   - Comparison Report: {saved_files['comparison_report']}")
     print(f"   - Improved Prompt: {saved_files['improved_prompt']}")
     print(f"   - JSON Data: {saved_files['json_data']}")
+    if saved_files['improved_prompt_version']:
+        print()
+        print(f"📝 Registered as deal_memo v{saved_files['improved_prompt_version']} (alias: candidate)")
+        print(f"   Promote with: python3 prompt_registry.py promote deal_memo {saved_files['improved_prompt_version']}")
     print()
+    if routing_summary():
+        print(routing_summary())
+        print()
     print("=" * 80)
     print()
 
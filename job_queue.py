@@ -0,0 +1,452 @@
+"""
+Job Queue
+Durable SQLite-backed queue and worker pool for the fetch → generate → analyze pipeline
+
+Submitting a company enqueues three jobs, each depending on the previous one
+(unless the company has fresh artifacts or jobs already in flight, see
+company_registry.py).
+Workers claim the highest-priority job whose dependency is done; failures are
+retried with exponential backoff and moved to the dead-letter state after
+max_attempts, which also dead-letters the jobs that depend on them.
+"""
+
+import os
+import json
+import sqlite3
+import time
+
+import company_registry
+import memo_versions
+import registry_db
+from prompt_registry import get_prompt
+
+DEFAULT_DB_PATH = "memo_jobs.db"
+
+STAGES = ["fetch", "generate", "analyze"]
+# Later stages first, so work already in progress finishes before new work starts
+STAGE_PRIORITIES = {'fetch': 10, 'generate': 20, 'analyze': 30}
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+STALE_AFTER_SECONDS = 30 * 60
+POLL_INTERVAL_SECONDS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL,
+    depends_on INTEGER REFERENCES jobs(id),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    company_key TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS jobs_depends_on ON jobs (depends_on);
+"""
+
+MIGRATIONS = [
+    ("company_key", "ALTER TABLE jobs ADD COLUMN company_key TEXT"),
+]
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Open the queue database (creating it if needed)"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(SCHEMA)
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, statement in MIGRATIONS:
+        if column not in columns:
+            conn.execute(statement)
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_company_key ON jobs (company_key, status)")
+    registry_db.ensure_schema(conn)
+    return conn
+
+
+def enqueue(conn, stage, payload, depends_on=None, priority=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+            company_key=None):
+    """Add one job and return its id"""
+    if stage not in STAGE_HANDLERS:
+        raise ValueError(f"Unknown stage: {stage}")
+    now = time.time()
+    cursor = conn.execute(
+        "INSERT INTO jobs (stage, payload, priority, depends_on, max_attempts, available_at, created_at, company_key) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (stage, json.dumps(payload), STAGE_PRIORITIES[stage] if priority is None else priority,
+         depends_on, max_attempts, now, now, company_key)
+    )
+    return cursor.lastrowid
+
+
+def submit_company(conn, company_url, prompt_version=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                   freshness_seconds=company_registry.DEFAULT_FRESHNESS_SECONDS, resolve_redirects=True):
+    """
+    Enqueue fetch → generate → analyze for one company, unless it is already done or in flight
+    Returns {'status': 'fresh' | 'coalesced' | 'queued', 'company_key', 'job_ids', 'company'}
+    """
+    if not company_url.startswith('http'):
+        company_url = 'https://' + company_url
+
+    company_key = company_registry.resolve_company_key(conn, company_url, resolve_redirects)
+    prompt_label = get_prompt('deal_memo', prompt_version).label
+    submission = {'company_key': company_key, 'job_ids': [], 'company': None}
+
+    payload = {'url': company_url, 'prompt_version': prompt_version}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        existing = company_registry.fresh_artifacts(conn, company_key, freshness_seconds, "analyze", prompt_label)
+        in_flight = [row['id'] for row in conn.execute(
+            "SELECT id FROM jobs WHERE company_key = ? AND status IN ('pending', 'running') ORDER BY id",
+            (company_key,)
+        )]
+
+        if existing:
+            submission.update(status='fresh', company=existing)
+        elif in_flight:
+            submission.update(status='coalesced', job_ids=in_flight)
+        else:
+            depends_on = None
+            for stage in STAGES:
+                depends_on = enqueue(conn, stage, payload, depends_on, max_attempts=max_attempts,
+                                     company_key=company_key)
+                submission['job_ids'].append(depends_on)
+            submission['status'] = 'queued'
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return submission
+
+
+def claim_next(conn, worker_id, stages=None):
+    """Atomically mark the next runnable job as running and return it (or None)"""
+    stages = stages or STAGES
+    placeholders = ",".join("?" for _ in stages)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            f"""
+            SELECT j.* FROM jobs j
+            LEFT JOIN jobs d ON d.id = j.depends_on
+            WHERE j.status = 'pending'
+              AND j.available_at <= ?
+              AND j.stage IN ({placeholders})
+              AND (j.depends_on IS NULL OR d.status = 'done')
+            ORDER BY j.priority DESC, j.id
+            LIMIT 1
+            """,
+            [time.time()] + list(stages)
+        ).fetchone()
+
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, worker = ? "
+                "WHERE id = ?",
+                (time.time(), worker_id, row['id'])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if row is None:
+        return None
+    job = dict(row)
+    job['attempts'] += 1
+    return job
+
+
+def mark_done(conn, job_id, result):
+    conn.execute(
+        "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL WHERE id = ?",
+        (time.time(), json.dumps(result), job_id)
+    )
+
+
+def mark_failed(conn, job, error):
+    """Schedule a retry with backoff, or dead-letter the job (and its dependents) when out of attempts"""
+    now = time.time()
+    if job['attempts'] < job['max_attempts']:
+        conn.execute(
+            "UPDATE jobs SET status = 'pending', available_at = ?, error = ? WHERE id = ?",
+            (now + RETRY_BACKOFF_SECONDS * 2 ** (job['attempts'] - 1), error, job['id'])
+        )
+        return 'pending'
+
+    conn.execute(
+        "UPDATE jobs SET status = 'dead', finished_at = ?, error = ? WHERE id = ?",
+        (now, error, job['id'])
+    )
+    # Dead-letter everything downstream, since it can never run
+    conn.execute(
+        """
+        WITH RECURSIVE downstream(id) AS (
+            SELECT id FROM jobs WHERE depends_on = ?
+            UNION ALL
+            SELECT j.id FROM jobs j JOIN downstream ds ON j.depends_on = ds.id
+        )
+        UPDATE jobs SET status = 'dead', finished_at = ?, error = ?
+        WHERE id IN (SELECT id FROM downstream) AND status = 'pending'
+        """,
+        (job['id'], now, f"dependency job {job['id']} failed")
+    )
+    return 'dead'
+
+
+def retry_dead(conn, job_id):
+    """Move a dead-lettered job and its dead-lettered dependents back to pending"""
+    changes_before = conn.total_changes
+    conn.execute(
+        """
+        WITH RECURSIVE chain(id) AS (
+            SELECT ?
+            UNION ALL
+            SELECT j.id FROM jobs j JOIN chain c ON j.depends_on = c.id
+        )
+        UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, error = NULL, finished_at = NULL
+        WHERE id IN (SELECT id FROM chain) AND status = 'dead'
+        """,
+        (job_id, time.time())
+    )
+    # cursor.rowcount is not reliable for statements starting with WITH
+    return conn.total_changes - changes_before
+
+
+def worker_alive(worker_id):
+    """
+    False if the worker's process is gone (worker ids end in the pid; SQLite in WAL mode only
+    works for processes on one host, so every worker is local)
+    """
+    try:
+        os.kill(int(str(worker_id).rsplit("-", 1)[-1]), 0)
+    except ProcessLookupError:
+        return False
+    except (ValueError, OverflowError, PermissionError):
+        return True
+    return True
+
+
+def recover_stale(conn, older_than=STALE_AFTER_SECONDS):
+    """
+    Handle jobs left 'running' by a crashed worker like failures: the crashed run counts as an
+    attempt (claim_next already counted it), so a job that keeps killing its worker is
+    dead-lettered after max_attempts instead of being requeued forever
+    A job is stale once its worker process is gone, or after older_than seconds
+    Returns the number of jobs recovered
+    """
+    cutoff = time.time() - older_than
+    # One transaction, so idle workers recovering at the same time count each crash once
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stale = [dict(row) for row in conn.execute("SELECT * FROM jobs WHERE status = 'running'")
+                 if row['started_at'] < cutoff or not worker_alive(row['worker'])]
+        for job in stale:
+            mark_failed(conn, job, f"worker {job['worker']} stopped while running the job")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return len(stale)
+
+
+def release_job(conn, job):
+    """Put a job back to pending right away when its worker is stopped (the attempt doesn't count)"""
+    conn.execute(
+        "UPDATE jobs SET status = 'pending', attempts = attempts - 1, available_at = ?, worker = NULL "
+        "WHERE id = ? AND status = 'running'",
+        (time.time(), job['id'])
+    )
+
+
+def dependency_result(conn, job):
+    row = conn.execute("SELECT result FROM jobs WHERE id = ?", (job['depends_on'],)).fetchone()
+    return json.loads(row['result'])
+
+
+def job_company_key(job, payload):
+    return job.get('company_key') or company_registry.canonical_company_key(payload['url'])
+
+
+def run_fetch(conn, job, payload):
+    from deal_memo_generator import fetch_website_content
+
+    company_data = fetch_website_content(payload['url'])
+    if 'error' in company_data and company_data['content'] == '':
+        raise RuntimeError(f"fetch failed: {company_data['error']}")
+    company_registry.record_fetch(conn, job_company_key(job, payload), payload['url'], company_data)
+    return company_data
+
+
+def run_generate(conn, job, payload):
+    from deal_memo_generator import generate_deal_memo, save_memo
+
+    company_data = dependency_result(conn, job)
+    memo = generate_deal_memo(company_data, payload.get('prompt_version'))
+    memo_file = save_memo(payload['url'], memo, payload.get('prompt_version'))
+    company_registry.record_memo(conn, job_company_key(job, payload), payload['url'], memo_file,
+                                 get_prompt('deal_memo', payload.get('prompt_version')).label)
+    return {'memo_file': memo_file}
+
+
+def run_analyze(conn, job, payload):
+    from quality_analyzer import analyze_memo_quality, read_memo, save_quality_report
+
+    memo_file = dependency_result(conn, job)['memo_file']
+    memo_content = read_memo(memo_file)
+    quality_report = analyze_memo_quality(memo_content, memo_file)
+    memo_versions.annotate_quality_report(conn, quality_report, memo_file)
+    json_file, txt_file = save_quality_report(quality_report, memo_file)
+    company_registry.record_quality(conn, memo_file, json_file, quality_report.get('overall_score'))
+    return {'quality_json': json_file, 'quality_txt': txt_file, 'overall_score': quality_report.get('overall_score')}
+
+
+STAGE_HANDLERS = {
+    'fetch': run_fetch,
+    'generate': run_generate,
+    'analyze': run_analyze,
+}
+
+
+def run_one(conn, worker_id, stages=None):
+    """Claim and run one job; returns (job, status) or None when nothing is runnable"""
+    job = claim_next(conn, worker_id, stages)
+    if job is None:
+        return None
+
+    try:
+        result = STAGE_HANDLERS[job['stage']](conn, job, json.loads(job['payload']))
+    except KeyboardInterrupt:
+        release_job(conn, job)
+        raise
+    except Exception as e:
+        return job, mark_failed(conn, job, f"{type(e).__name__}: {e}")
+
+    mark_done(conn, job['id'], result)
+    return job, 'done'
+
+
+def worker_loop(db_path=DEFAULT_DB_PATH, stages=None, exit_when_idle=False, poll_interval=POLL_INTERVAL_SECONDS):
+    """Process jobs until interrupted (or until the queue is idle, if exit_when_idle)"""
+    worker_id = f"worker-{os.getpid()}"
+    conn = connect(db_path)
+    try:
+        while True:
+            outcome = run_one(conn, worker_id, stages)
+            if outcome is not None:
+                job, status = outcome
+                icon = {'done': '✅', 'pending': '🔁', 'dead': '💀'}[status]
+                print(f"{icon} [{worker_id}] job {job['id']} {job['stage']} → {status}", flush=True)
+                continue
+
+            # Idle: pick up jobs orphaned by workers that died since the pool started
+            recovered = recover_stale(conn)
+            if recovered:
+                print(f"♻️  [{worker_id}] returned {recovered} stale running job(s) to the queue", flush=True)
+                continue
+            if exit_when_idle and not has_pending_work(conn, stages):
+                return
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+def has_pending_work(conn, stages=None):
+    stages = stages or STAGES
+    placeholders = ",".join("?" for _ in stages)
+    row = conn.execute(
+        f"SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running') AND stage IN ({placeholders})",
+        list(stages)
+    ).fetchone()
+    return row[0] > 0
+
+
+def run_workers(db_path=DEFAULT_DB_PATH, processes=4, stages=None, exit_when_idle=False,
+                poll_interval=POLL_INTERVAL_SECONDS):
+    """Run a pool of worker processes against the queue"""
+    import multiprocessing
+
+    conn = connect(db_path)
+    recovered = recover_stale(conn)
+    conn.close()
+    if recovered:
+        print(f"♻️  Returned {recovered} stale running job(s) to the queue")
+
+    workers = [
+        multiprocessing.Process(target=worker_loop, args=(db_path, stages, exit_when_idle, poll_interval))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.join()
+
+
+def queue_stats(conn, window_seconds=3600):
+    """Queue depth per stage/status and throughput over the last window"""
+    depth = {stage: {'pending': 0, 'running': 0, 'done': 0, 'dead': 0} for stage in STAGES}
+    for row in conn.execute("SELECT stage, status, COUNT(*) AS n FROM jobs GROUP BY stage, status"):
+        depth.setdefault(row['stage'], {})[row['status']] = row['n']
+
+    since = time.time() - window_seconds
+    throughput = {stage: {'completed': 0, 'avg_seconds': None} for stage in STAGES}
+    for row in conn.execute(
+        "SELECT stage, COUNT(*) AS n, AVG(finished_at - started_at) AS avg_seconds FROM jobs "
+        "WHERE status = 'done' AND finished_at >= ? GROUP BY stage",
+        (since,)
+    ):
+        throughput[row['stage']] = {'completed': row['n'], 'avg_seconds': row['avg_seconds']}
+
+    return {
+        'depth': depth,
+        'throughput': throughput,
+        'window_seconds': window_seconds,
+        'per_hour': {stage: t['completed'] * 3600 / window_seconds for stage, t in throughput.items()}
+    }
+
+
+def dead_letters(conn, limit=50):
+    return [dict(row) for row in conn.execute(
+        "SELECT id, stage, payload, attempts, error, finished_at FROM jobs WHERE status = 'dead' "
+        "ORDER BY finished_at DESC LIMIT ?",
+        (limit,)
+    )]
+
+
+def generate_queue_report(stats):
+    """Human-readable queue depth and throughput"""
+    report = []
+    report.append("=" * 70)
+    report.append("JOB QUEUE")
+    report.append("=" * 70)
+    report.append("")
+    report.append(f"{'Stage':<10} {'Pending':>8} {'Running':>8} {'Done':>8} {'Dead':>6}   "
+                  f"{'Done/hr':>8} {'Avg s':>7}")
+    for stage, counts in stats['depth'].items():
+        throughput = stats['throughput'].get(stage, {})
+        avg = throughput.get('avg_seconds')
+        avg_text = "-" if avg is None else f"{avg:.1f}"
+        report.append(f"{stage:<10} {counts.get('pending', 0):>8} {counts.get('running', 0):>8} "
+                      f"{counts.get('done', 0):>8} {counts.get('dead', 0):>6}   "
+                      f"{stats['per_hour'].get(stage, 0):>8.1f} {avg_text:>7}")
+    report.append("")
+    report.append(f"Throughput window: last {stats['window_seconds'] // 60} minutes")
+    report.append("=" * 70)
+    return "\n".join(report)
@@ -0,0 +1,98 @@
+"""
+LLM Client
+Shared Claude calls for the generator, analyzer and improvement engine (sync and async)
+"""
+
+import os
+
+import cassette
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+FAST_MODEL = "claude-3-5-haiku-20241022"  # cheaper/faster, e.g. for ensemble analysis runs
+DEFAULT_TIMEOUT = 300  # seconds per async API call
+
+_sync_client = None
+
+
+def get_client():
+    """Return a process-wide Anthropic client (created on first use)"""
+    global _sync_client
+    if _sync_client is None:
+        import anthropic
+        _sync_client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    return _sync_client
+
+
+def create_async_client():
+    """Create an AsyncAnthropic client; share one across concurrent jobs and close it when done"""
+    import anthropic
+    return anthropic.AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+
+
+def message_to_dict(message):
+    """The parts of a Messages API response the pipeline uses, as plain data (for cassettes)"""
+    return {
+        'model': getattr(message, 'model', None),
+        'text': message.content[0].text,
+        'stop_reason': getattr(message, 'stop_reason', None),
+        'usage': {
+            'input_tokens': getattr(message.usage, 'input_tokens', 0),
+            'output_tokens': getattr(message.usage, 'output_tokens', 0)
+        }
+    }
+
+
+def message_from_dict(data):
+    """Rebuild a message-like object from message_to_dict output"""
+    from types import SimpleNamespace
+    return SimpleNamespace(
+        model=data['model'],
+        content=[SimpleNamespace(type="text", text=data['text'])],
+        stop_reason=data['stop_reason'],
+        usage=SimpleNamespace(**data['usage'])
+    )
+
+
+def _message_request(prompt, max_tokens, model):
+    return {
+        'model': model,
+        'max_tokens': max_tokens,
+        'messages': [
+            {"role": "user", "content": prompt}
+        ]
+    }
+
+
+def create_message(prompt, max_tokens, model=DEFAULT_MODEL):
+    """Send a single-turn prompt and return the full message (text, usage, stop_reason)"""
+    request = _message_request(prompt, max_tokens, model)
+    return cassette.call('llm', request, lambda: get_client().messages.create(**request),
+                         message_to_dict, message_from_dict)
+
+
+def complete(prompt, max_tokens, model=DEFAULT_MODEL):
+    """Send a single-turn prompt and return the response text"""
+    return create_message(prompt, max_tokens, model).content[0].text
+
+
+async def create_message_async(prompt, max_tokens, model=DEFAULT_MODEL, client=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Async counterpart of create_message()
+    Raises asyncio.TimeoutError after `timeout` seconds; cancelling the task aborts the request
+    """
+    import asyncio
+
+    if client is None:
+        async with create_async_client() as client:
+            return await create_message_async(prompt, max_tokens, model, client, timeout)
+
+    request = _message_request(prompt, max_tokens, model)
+    return await cassette.call_async('llm', request,
+                                     lambda: asyncio.wait_for(client.messages.create(**request), timeout),
+                                     message_to_dict, message_from_dict)
+
+
+async def complete_async(prompt, max_tokens, model=DEFAULT_MODEL, client=None, timeout=DEFAULT_TIMEOUT):
+    """Async counterpart of complete()"""
+    message = await create_message_async(prompt, max_tokens, model, client, timeout)
+    return message.content[0].text
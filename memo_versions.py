@@ -0,0 +1,272 @@
+"""
+Memo Versions
+Successive memo versions per company, stored as hashed section chunks, with section-level diffs
+
+Each memo is split into its sections (executive summary, market analysis, ...)
+and each section into paragraph chunks. Chunks are stored once by content hash,
+and every version keeps a hash per section. Comparing two versions compares
+section hashes first, then diffs only the changed sections' chunk-hash lists.
+Versions are linked to their quality reports, so a quality report can record
+which sections changed since the previous version and how their scores moved.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import difflib
+
+PREAMBLE = "_preamble"  # title / generated-at header before the first section; never reported as changed
+
+# Heading keywords -> quality_analyzer section keys; specific phrases are checked before generic ones
+SECTION_KEYWORDS = [
+    ('executive_summary', ('executive summary',)),
+    ('business_model', ('business model',)),
+    ('investment_thesis', ('thesis',)),
+    ('competitive_landscape', ('competit',)),
+    ('risks_considerations', ('risk',)),
+    ('market_analysis', ('market',)),
+    ('product_technology', ('product', 'technology')),
+    ('company_overview', ('company', 'overview')),
+    ('executive_summary', ('summary',)),
+]
+
+# Markdown heading, a whole bold line, or a numbered all-caps line ("3. MARKET ANALYSIS")
+HEADING_RE = re.compile(r"^(?:(?P<hashes>#{1,6})\s+(?P<md>.+?)|\*\*(?P<bold>[^*]+)\*\*:?|(?P<num>\d+\.\s+[A-Z][A-Z&/,\s-]+))\s*$")
+# Bold and numbered-caps headings rank below every markdown heading, so in a memo with
+# "#" headings they are only ever subheadings
+PLAIN_HEADING_LEVEL = 7
+
+
+def _hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def heading_section(line):
+    """(section key, heading level) if the line is a heading naming a memo section, else None"""
+    match = HEADING_RE.match(line.strip())
+    if not match:
+        return None
+    title = re.sub(r"^\d+\.\s*", "", match.group('md') or match.group('bold') or match.group('num')).strip("* ").lower()
+    if "://" in title:  # the "# Investment Memo: <url>" header
+        return None
+    for section, keywords in SECTION_KEYWORDS:
+        if any(keyword in title for keyword in keywords):
+            return section, len(match.group('hashes')) if match.group('hashes') else PLAIN_HEADING_LEVEL
+    return None
+
+
+def split_memo_sections(memo_content):
+    """
+    [(section key, text)] in memo order
+    Subheadings that happen to mention another section's keyword (e.g. "Market risks") don't
+    start a new section: each section starts once, at no deeper a heading level than the first
+    """
+    sections = [(PREAMBLE, [])]
+    seen = set()
+    section_level = None
+    for line in memo_content.splitlines():
+        found = heading_section(line)
+        if found and found[0] not in seen and (section_level is None or found[1] <= section_level):
+            section, level = found
+            seen.add(section)
+            section_level = level if section_level is None else section_level
+            sections.append((section, []))
+        sections[-1][1].append(line)
+    return [(section, "\n".join(lines)) for section, lines in sections if section != PREAMBLE or any(lines)]
+
+
+def split_chunks(text):
+    """Paragraph chunks with whitespace normalized, so re-wrapping alone doesn't count as a change"""
+    return [" ".join(paragraph.split()) for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+
+
+def memo_fingerprint(memo_content):
+    """[(section, section_hash, [chunk hashes], {hash: text})] for a memo"""
+    fingerprint = []
+    for section, text in split_memo_sections(memo_content):
+        chunks = split_chunks(text)
+        hashes = [_hash(chunk) for chunk in chunks]
+        fingerprint.append((section, _hash(" ".join(hashes)), hashes, dict(zip(hashes, chunks))))
+    return fingerprint
+
+
+def get_version(conn, memo_file):
+    row = conn.execute("SELECT * FROM memo_versions WHERE memo_file = ?", (os.path.abspath(memo_file),)).fetchone()
+    return dict(row) if row else None
+
+
+def list_versions(conn, company_key):
+    return [dict(row) for row in conn.execute(
+        "SELECT * FROM memo_versions WHERE company_key = ? ORDER BY version", (company_key,)
+    )]
+
+
+def record_version(conn, company_key, memo_file, prompt_label=None, memo_content=None):
+    """Store a memo as the company's next version (no-op if the file is already recorded); returns the version"""
+    existing = get_version(conn, memo_file)
+    if existing:
+        return existing['version']
+    if memo_content is None:
+        with open(memo_file, 'r') as f:
+            memo_content = f.read()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM memo_versions WHERE company_key = ?",
+                               (company_key,)).fetchone()[0]
+        version_id = conn.execute(
+            "INSERT INTO memo_versions (company_key, version, memo_file, prompt_version, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (company_key, version, os.path.abspath(memo_file), prompt_label, time.time())
+        ).lastrowid
+        for position, (section, section_hash, hashes, chunks) in enumerate(memo_fingerprint(memo_content)):
+            conn.executemany("INSERT OR IGNORE INTO memo_chunks (hash, text) VALUES (?, ?)", chunks.items())
+            conn.execute(
+                "INSERT INTO memo_sections (version_id, position, section, section_hash, chunk_hashes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (version_id, position, section, section_hash, " ".join(hashes))
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return version
+
+
+def link_quality(conn, memo_file, quality_json, overall_score, section_scores=None):
+    """Attach a quality report (and its per-section scores) to the memo version it analyzed"""
+    version = get_version(conn, memo_file)
+    if version is None:
+        return
+    if section_scores is None:
+        try:
+            with open(quality_json, 'r') as f:
+                section_scores = json.load(f).get('section_scores', {})
+        except (OSError, ValueError):
+            section_scores = {}
+    conn.execute("UPDATE memo_versions SET quality_json = ?, overall_score = ? WHERE id = ?",
+                 (os.path.abspath(quality_json), overall_score, version['id']))
+    conn.executemany(
+        "UPDATE memo_sections SET score = ? WHERE version_id = ? AND section = ?",
+        [(data.get('score'), version['id'], section) for section, data in section_scores.items()
+         if isinstance(data, dict)]
+    )
+
+
+def _sections(conn, version_id):
+    return {row['section']: dict(row) for row in conn.execute(
+        "SELECT * FROM memo_sections WHERE version_id = ? ORDER BY position", (version_id,)
+    )}
+
+
+def diff_versions(conn, old, new, include_text=False):
+    """
+    {section: {'status', 'chunks_added', 'chunks_removed', 'previous_score', 'score'}} between two
+    memo_versions rows; unchanged sections are compared by hash only
+    With include_text, changed sections also get 'added'/'removed' paragraph texts
+    """
+    old_sections = _sections(conn, old['id'])
+    new_sections = _sections(conn, new['id'])
+    diff = {}
+    for section in list(new_sections) + [s for s in old_sections if s not in new_sections]:
+        if section == PREAMBLE:
+            continue
+        before = old_sections.get(section)
+        after = new_sections.get(section)
+        entry = {'previous_score': before and before['score'], 'score': after and after['score']}
+        if before is None or after is None:
+            hashes = (after or before)['chunk_hashes'].split()
+            entry.update(status='added' if before is None else 'removed',
+                         chunks_added=len(hashes) if before is None else 0,
+                         chunks_removed=len(hashes) if after is None else 0)
+            added, removed = (hashes, []) if before is None else ([], hashes)
+        elif before['section_hash'] == after['section_hash']:
+            entry.update(status='unchanged', chunks_added=0, chunks_removed=0)
+            added, removed = [], []
+        else:
+            old_hashes = before['chunk_hashes'].split()
+            new_hashes = after['chunk_hashes'].split()
+            added, removed = [], []
+            matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag != 'equal':
+                    removed.extend(old_hashes[i1:i2])
+                    added.extend(new_hashes[j1:j2])
+            entry.update(status='changed', chunks_added=len(added), chunks_removed=len(removed))
+
+        if include_text and entry['status'] != 'unchanged':
+            entry['added'] = [chunk_text(conn, h) for h in added]
+            entry['removed'] = [chunk_text(conn, h) for h in removed]
+        diff[section] = entry
+    return diff
+
+
+def chunk_text(conn, chunk_hash):
+    row = conn.execute("SELECT text FROM memo_chunks WHERE hash = ?", (chunk_hash,)).fetchone()
+    return row['text'] if row else ""
+
+
+def previous_version(conn, version):
+    row = conn.execute("SELECT * FROM memo_versions WHERE company_key = ? AND version < ? ORDER BY version DESC LIMIT 1",
+                       (version['company_key'], version['version'])).fetchone()
+    return dict(row) if row else None
+
+
+def memo_changes(conn, memo_file, section_scores=None):
+    """
+    Changes since the company's previous memo version, for a quality report's metadata
+    (None if the memo isn't versioned or is the first version)
+    section_scores (from the new quality report) fill in the current scores
+    """
+    version = get_version(conn, memo_file)
+    previous = version and previous_version(conn, version)
+    if not previous:
+        return None
+
+    sections = diff_versions(conn, previous, version)
+    for section, entry in sections.items():
+        score = (section_scores or {}).get(section, {}).get('score')
+        if score is not None:
+            entry['score'] = score
+    return {
+        'company_key': version['company_key'],
+        'version': version['version'],
+        'previous_version': previous['version'],
+        'previous_memo_file': previous['memo_file'],
+        'previous_quality_json': previous['quality_json'],
+        'previous_overall_score': previous['overall_score'],
+        'changed_sections': [s for s, entry in sections.items() if entry['status'] != 'unchanged'],
+        'sections': sections
+    }
+
+
+def annotate_quality_report(conn, quality_report, memo_file):
+    """Add metadata.memo_changes to a quality report before it is saved"""
+    changes = memo_changes(conn, memo_file, quality_report.get('section_scores'))
+    if changes:
+        quality_report.setdefault('metadata', {})['memo_changes'] = changes
+    return quality_report
+
+
+def generate_diff_lines(company_key, old, new, diff):
+    """Readable section diff between two versions, with score movement"""
+    yield f"{company_key}: v{old['version']} → v{new['version']}"
+    yield f"  {os.path.basename(old['memo_file'])} → {os.path.basename(new['memo_file'])}"
+    if old['overall_score'] is not None or new['overall_score'] is not None:
+        yield f"  Overall score: {old['overall_score']} → {new['overall_score']}"
+    yield ""
+    for section, entry in diff.items():
+        title = section.replace('_', ' ').title()
+        score = ""
+        if entry['previous_score'] is not None or entry['score'] is not None:
+            score = f"  score {entry['previous_score']} → {entry['score']}"
+        if entry['status'] == 'unchanged':
+            yield f"  = {title}{score}"
+            continue
+        yield f"  ✎ {title} ({entry['status']}: +{entry['chunks_added']} / -{entry['chunks_removed']} paragraphs){score}"
+        for text in entry.get('removed', []):
+            yield f"      - {text[:160]}"
+        for text in entry.get('added', []):
+            yield f"      + {text[:160]}"
@@ -0,0 +1,174 @@
+"""
+Model Router
+Pick a model tier and max_tokens per task from a cost/latency budget and the input size
+
+Without a cost or latency budget, every task runs on the standard tier.
+With a budget, a task starts on the cheapest tier that fits the budget and
+its input size. It escalates to the next tier only when the result fails the
+caller's validation or confidence check, or is truncated. Every routed call is
+tallied so a run can report its tier mix and its savings against running
+everything on the standard tier.
+"""
+
+from llm_client import DEFAULT_MODEL, DEFAULT_TIMEOUT, FAST_MODEL, create_message, create_message_async
+
+CHARS_PER_TOKEN = 4  # rough input-size estimate, good enough for routing
+
+# Ordered cheapest first. Prices are USD per million tokens; latency is a rough planning estimate
+TIERS = {
+    'fast': {'model': FAST_MODEL, 'input_cost': 0.80, 'output_cost': 4.00,
+             'overhead_seconds': 1.0, 'output_tokens_per_second': 120, 'max_input_tokens': 50000},
+    'standard': {'model': DEFAULT_MODEL, 'input_cost': 3.00, 'output_cost': 15.00,
+                 'overhead_seconds': 2.0, 'output_tokens_per_second': 60, 'max_input_tokens': 180000},
+}
+BASELINE_TIER = 'standard'
+
+# Per task: allowed tiers (cheapest first), max_tokens, typical output size, and the floor
+# below which max_tokens is never cut to meet a latency budget
+TASKS = {
+    'deal_memo': {'tiers': ['fast', 'standard'], 'max_tokens': 4000, 'expected_output_tokens': 2500,
+                  'min_tokens': 2500},
+    'quality_analysis': {'tiers': ['fast', 'standard'], 'max_tokens': 4000, 'expected_output_tokens': 2000,
+                         'min_tokens': 2500},
+    'prompt_improvement': {'tiers': ['standard'], 'max_tokens': 6000, 'expected_output_tokens': 3500,
+                           'min_tokens': 4000},
+}
+
+# No limits by default: every task runs on the standard tier
+_budget = {'max_cost_usd': None, 'max_latency_seconds': None}
+_run_stats = None
+
+
+def set_budget(max_cost_usd=None, max_latency_seconds=None):
+    """Per-call budget used when routing (None = unlimited)"""
+    _budget.update(max_cost_usd=max_cost_usd, max_latency_seconds=max_latency_seconds)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_cost(tier_name, input_tokens, output_tokens):
+    tier = TIERS[tier_name]
+    return (input_tokens * tier['input_cost'] + output_tokens * tier['output_cost']) / 1_000_000
+
+
+def estimate_latency(tier_name, output_tokens):
+    tier = TIERS[tier_name]
+    return tier['overhead_seconds'] + output_tokens / tier['output_tokens_per_second']
+
+
+def plan_route(task, prompt, budget=None):
+    """
+    Return [(tier, max_tokens), ...]: the first entry is the chosen tier, the rest are escalations
+    Without a budget the standard tier is chosen. With one, the first tier whose estimated cost
+    and latency fit is chosen (or, if none fits, the cheapest one that can take the input);
+    max_tokens is trimmed toward min_tokens to fit a latency budget
+    """
+    config = TASKS[task]
+    budget = budget or _budget
+    input_tokens = estimate_tokens(prompt)
+    tiers = [name for name in config['tiers'] if input_tokens <= TIERS[name]['max_input_tokens']]
+    if not tiers:
+        tiers = config['tiers'][-1:]
+
+    def fits(name):
+        cost = estimate_cost(name, input_tokens, config['expected_output_tokens'])
+        latency = estimate_latency(name, config['expected_output_tokens'])
+        return ((budget['max_cost_usd'] is None or cost <= budget['max_cost_usd'])
+                and (budget['max_latency_seconds'] is None or latency <= budget['max_latency_seconds']))
+
+    if budget['max_cost_usd'] is None and budget['max_latency_seconds'] is None:
+        start = tiers.index(BASELINE_TIER) if BASELINE_TIER in tiers else 0
+    else:
+        start = next((i for i, name in enumerate(tiers) if fits(name)), 0)
+
+    plan = []
+    for name in tiers[start:]:
+        max_tokens = config['max_tokens']
+        if budget['max_latency_seconds'] is not None:
+            tier = TIERS[name]
+            affordable = int((budget['max_latency_seconds'] - tier['overhead_seconds']) * tier['output_tokens_per_second'])
+            max_tokens = max(config['min_tokens'], min(max_tokens, affordable))
+        plan.append((name, max_tokens))
+    return plan
+
+
+def reset_run_stats():
+    global _run_stats
+    _run_stats = {'calls': {}, 'tasks': 0, 'escalations': 0, 'validation_failures': 0,
+                  'cost_usd': 0.0, 'baseline_cost_usd': 0.0}
+
+
+def run_stats():
+    if _run_stats is None:
+        reset_run_stats()
+    return _run_stats
+
+
+def _record(tier_name, message):
+    stats = run_stats()
+    usage = getattr(message, 'usage', None)
+    input_tokens = getattr(usage, 'input_tokens', 0) or 0
+    output_tokens = getattr(usage, 'output_tokens', 0) or 0
+    stats['calls'][tier_name] = stats['calls'].get(tier_name, 0) + 1
+    stats['cost_usd'] += estimate_cost(tier_name, input_tokens, output_tokens)
+
+
+def _check(message, validate):
+    """None if the result is usable, else the reason to escalate"""
+    if getattr(message, 'stop_reason', None) == 'max_tokens':
+        return "truncated at max_tokens"
+    return validate(message.content[0].text) if validate else None
+
+
+def _finish(task, tier_name, message, escalated, failure):
+    stats = run_stats()
+    stats['tasks'] += 1
+    stats['escalations'] += escalated
+    stats['validation_failures'] += failure is not None
+    # Baseline: the final result's tokens, billed once on the standard tier
+    usage = getattr(message, 'usage', None)
+    stats['baseline_cost_usd'] += estimate_cost(BASELINE_TIER, getattr(usage, 'input_tokens', 0) or 0,
+                                                getattr(usage, 'output_tokens', 0) or 0)
+    if failure:
+        print(f"⚠️  {task}: {tier_name} result still failed validation ({failure}), using it anyway")
+    return message.content[0].text
+
+
+def complete_routed(task, prompt, validate=None, budget=None):
+    """
+    Routed counterpart of llm_client.complete
+    validate(text) returns None when the result is acceptable, or a reason to escalate
+    """
+    plan = plan_route(task, prompt, budget)
+    for escalated, (tier_name, max_tokens) in enumerate(plan):
+        message = create_message(prompt, max_tokens, TIERS[tier_name]['model'])
+        _record(tier_name, message)
+        failure = _check(message, validate)
+        if failure is None or escalated == len(plan) - 1:
+            return _finish(task, tier_name, message, escalated, failure)
+
+
+async def complete_routed_async(task, prompt, validate=None, budget=None, client=None, timeout=DEFAULT_TIMEOUT):
+    """Async counterpart of complete_routed"""
+    plan = plan_route(task, prompt, budget)
+    for escalated, (tier_name, max_tokens) in enumerate(plan):
+        message = await create_message_async(prompt, max_tokens, TIERS[tier_name]['model'], client, timeout)
+        _record(tier_name, message)
+        failure = _check(message, validate)
+        if failure is None or escalated == len(plan) - 1:
+            return _finish(task, tier_name, message, escalated, failure)
+
+
+def routing_summary():
+    """One-line tier mix and savings for the calls made so far, or None if there were none"""
+    stats = run_stats()
+    if not stats['tasks']:
+        return None
+    mix = ", ".join(f"{name} {stats['calls'][name]}" for name in TIERS if name in stats['calls'])
+    saved = stats['baseline_cost_usd'] - stats['cost_usd']
+    saved_pct = saved / stats['baseline_cost_usd'] * 100 if stats['baseline_cost_usd'] else 0
+    return (f"🧭 Model routing: {sum(stats['calls'].values())} call(s) for {stats['tasks']} task(s) ({mix}), "
+            f"{stats['escalations']} escalation(s); ${stats['cost_usd']:.4f} vs "
+            f"${stats['baseline_cost_usd']:.4f} all-{BASELINE_TIER} (saved {saved_pct:.0f}%)")
@@ -0,0 +1,214 @@
+"""
+Prompt Registry
+Versioned prompt templates for the generator, analyzer and improvement engine
+"""
+
+import os
+import json
+import string
+import sys
+from datetime import datetime
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_registry.json")
+DEFAULT_ALIAS = "current"
+
+_formatter = string.Formatter()
+_registry_cache = {}
+_compiled_cache = {}
+
+
+class PromptTemplate:
+    """A prompt template parsed once into literal text and fields"""
+
+    def __init__(self, name, version, template):
+        self.name = name
+        self.version = version
+        self.template = template
+        self._segments = list(_formatter.parse(template))
+        self.fields = sorted({field for _, field, _, _ in self._segments if field})
+
+    @property
+    def label(self):
+        return f"{self.name}@v{self.version}"
+
+    def render(self, **values):
+        """Fill in the template fields"""
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise KeyError(f"Prompt {self.label} is missing values for: {', '.join(missing)}")
+
+        parts = []
+        for literal, field, spec, conversion in self._segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            value = _formatter.convert_field(values[field], conversion)
+            parts.append(format(value, spec or ""))
+        return "".join(parts)
+
+
+def load_registry(path=REGISTRY_PATH):
+    """Load the registry file once per process"""
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+
+    cached = _registry_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    if mtime is None:
+        registry = {'format': 1, 'prompts': {}}
+    else:
+        with open(path, 'r') as f:
+            registry = json.load(f)
+
+    _registry_cache[path] = (mtime, registry)
+    return registry
+
+
+def _save_registry(registry, path=REGISTRY_PATH):
+    """Write the registry atomically and refresh the in-process cache"""
+    path = os.path.abspath(path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+    _registry_cache[path] = (os.path.getmtime(path), registry)
+    for key in [key for key in _compiled_cache if key[0] == path]:
+        del _compiled_cache[key]
+
+
+def resolve_version(name, version=None, path=REGISTRY_PATH):
+    """Resolve a version number, numeric string or alias to a version number"""
+    registry = load_registry(path)
+    if name not in registry['prompts']:
+        raise KeyError(f"Unknown prompt: {name}")
+
+    entry = registry['prompts'][name]
+    if version is None:
+        version = DEFAULT_ALIAS
+
+    if isinstance(version, int) or str(version).isdigit():
+        version = int(version)
+    elif version in entry['aliases']:
+        version = entry['aliases'][version]
+    else:
+        raise KeyError(f"Unknown version or alias for {name}: {version}")
+
+    if str(version) not in entry['versions']:
+        raise KeyError(f"Unknown version for {name}: {version}")
+
+    return version
+
+
+def get_prompt(name, version=None, path=REGISTRY_PATH):
+    """Return the compiled template for a prompt version or alias (default: current)"""
+    version = resolve_version(name, version, path)
+
+    key = (os.path.abspath(path), name, version)
+    if key not in _compiled_cache:
+        entry = load_registry(path)['prompts'][name]['versions'][str(version)]
+        _compiled_cache[key] = PromptTemplate(name, version, entry['template'])
+
+    return _compiled_cache[key]
+
+
+def validate_template(name, template, path=REGISTRY_PATH):
+    """
+    Raise ValueError unless the template parses and uses the same fields as the current version
+    (callers render it with those fields, so a different set would fail on every call)
+    """
+    # Fail early on malformed templates (unbalanced braces etc.)
+    fields = PromptTemplate(name, 0, template).fields
+
+    entry = load_registry(path)['prompts'].get(name)
+    if not entry or not entry['versions']:
+        return fields
+    current = get_prompt(name, path=path)
+    if fields != current.fields:
+        raise ValueError(f"{name} fields {fields} don't match {current.label} fields {current.fields}")
+    return fields
+
+
+def register_prompt(name, template, alias=None, source="manual", notes="", path=REGISTRY_PATH):
+    """Store a new prompt version and optionally point an alias at it"""
+    validate_template(name, template, path)
+
+    registry = load_registry(path)
+    entry = registry['prompts'].setdefault(name, {'aliases': {}, 'versions': {}})
+
+    version = max([int(v) for v in entry['versions']] + [0]) + 1
+    entry['versions'][str(version)] = {
+        'template': template,
+        'created_at': datetime.now().isoformat(),
+        'source': source,
+        'notes': notes
+    }
+
+    if alias:
+        entry['aliases'][alias] = version
+    if DEFAULT_ALIAS not in entry['aliases']:
+        entry['aliases'][DEFAULT_ALIAS] = version
+
+    _save_registry(registry, path)
+    return version
+
+
+def set_alias(name, alias, version, path=REGISTRY_PATH):
+    """Point an alias at an existing version (its fields must match the current version's)"""
+    version = resolve_version(name, version, path)
+    validate_template(name, get_prompt(name, version, path).template, path)
+    registry = load_registry(path)
+    registry['prompts'][name]['aliases'][alias] = version
+    _save_registry(registry, path)
+    return version
+
+
+def promote_prompt(name, version, path=REGISTRY_PATH):
+    """Make a version the one used by default"""
+    return set_alias(name, DEFAULT_ALIAS, version, path)
+
+
+def list_prompts(path=REGISTRY_PATH):
+    """Summarize prompts, versions and aliases"""
+    registry = load_registry(path)
+    summary = []
+    for name, entry in sorted(registry['prompts'].items()):
+        for version, data in sorted(entry['versions'].items(), key=lambda item: int(item[0])):
+            aliases = sorted(a for a, v in entry['aliases'].items() if v == int(version))
+            summary.append({
+                'name': name,
+                'version': int(version),
+                'aliases': aliases,
+                'created_at': data.get('created_at'),
+                'source': data.get('source')
+            })
+    return summary
+
+
+def main():
+    """List prompts or promote a version: prompt_registry.py [list | promote NAME VERSION]"""
+
+    args = sys.argv[1:]
+
+    if not args or args[0] == "list":
+        for item in list_prompts():
+            aliases = f" ({', '.join(item['aliases'])})" if item['aliases'] else ""
+            print(f"{item['name']} v{item['version']}{aliases} - {item['source']}, {item['created_at']}")
+        return
+
+    if args[0] == "promote" and len(args) == 3:
+        try:
+            version = promote_prompt(args[1], args[2])
+        except (KeyError, ValueError) as e:
+            print(f"❌ {e.args[0] if e.args else e}")
+            return
+        print(f"✅ {args[1]} now uses v{version}")
+        return
+
+    print("Usage: python3 prompt_registry.py [list | promote NAME VERSION]")
+
+if __name__ == "__main__":
+    main()
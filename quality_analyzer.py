@@ -4,130 +4,46 @@ Analyzes generated memos and provides quality scores, completeness flags, and im
 """
 
 import os
+import re
 import json
-import anthropic
+from prompt_registry import get_prompt
+from llm_client import DEFAULT_TIMEOUT, complete, complete_async
+from model_router import complete_routed, complete_routed_async, routing_summary
 from datetime import datetime
 import sys
 
-def analyze_memo_quality(memo_content, memo_filepath=None):
-    """
-    Analyze a deal memo for quality using Claude
-    Returns structured quality assessment with scores and flags
-    """
+# Section keys in the order the analysis prompt asks for them
+SECTION_KEYS = [
+    "executive_summary",
+    "company_overview",
+    "market_analysis",
+    "product_technology",
+    "business_model",
+    "competitive_landscape",
+    "risks_considerations",
+    "investment_thesis"
+]
+
+ANALYSIS_MAX_TOKENS = 4000  # when a model is given explicitly (otherwise model_router decides)
+CONSISTENCY_TOLERANCE = 2.5  # max gap between overall score and mean section score before escalating
+MAX_MEMO_CHARS = 200000  # ~50k tokens; anything longer is truncated before analysis
+
+def read_memo(memo_filepath, max_chars=MAX_MEMO_CHARS):
+    """Read at most max_chars of a memo, so oversized files never load whole into memory"""
+    with open(memo_filepath, 'r') as f:
+        memo_content = f.read(max_chars + 1)
+    if len(memo_content) > max_chars:
+        print(f"⚠️  Memo is longer than {max_chars} characters, analyzing the first {max_chars}")
+        memo_content = memo_content[:max_chars] + "\n\n[Memo truncated for analysis]\n"
+    return memo_content
+
+def memo_prompt_label(memo_content):
+    """Prompt version recorded in a memo header by save_memo (e.g. deal_memo@v2), if any"""
+    match = re.search(r"^\*Prompt: (\S+)\*$", memo_content[:1000], re.MULTILINE)
+    return match.group(1) if match else None
 
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-
-    quality_prompt = f"""You are a senior venture capital analyst reviewing a deal memo for quality.
-
-Analyze the following investment memo and provide a comprehensive quality assessment.
-
-MEMO TO ANALYZE:
-{memo_content}
-
-Provide your analysis in the following JSON structure:
-
-{{
-  "overall_score": <1-10>,
-  "overall_assessment": "<2-3 sentence summary>",
-  "section_scores": {{
-    "executive_summary": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": ["<specific issue 1>", "<specific issue 2>"],
-      "strengths": ["<strength 1>", "<strength 2>"]
-    }},
-    "company_overview": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }},
-    "market_analysis": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }},
-    "product_technology": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }},
-    "business_model": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }},
-    "competitive_landscape": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }},
-    "risks_considerations": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }},
-    "investment_thesis": {{
-      "score": <1-10>,
-      "completeness": "<complete/partial/insufficient>",
-      "issues": [],
-      "strengths": []
-    }}
-  }},
-  "data_verification": {{
-    "quantitative_claims": <number of quantitative claims found>,
-    "sourced_claims": <number with clear sources>,
-    "unsourced_claims": ["<claim 1>", "<claim 2>"],
-    "potential_hallucinations": ["<concern 1>", "<concern 2>"]
-  }},
-  "red_flags": [
-    {{
-      "severity": "<critical/high/medium/low>",
-      "category": "<generic_language/unsupported_claim/insufficient_detail/logical_inconsistency>",
-      "description": "<specific red flag>",
-      "location": "<section name>"
-    }}
-  ],
-  "improvement_priorities": [
-    {{
-      "priority": <1-5, where 1 is highest>,
-      "section": "<section name>",
-      "recommendation": "<specific actionable recommendation>"
-    }}
-  ]
-}}
-
-Scoring Guidelines:
-- 9-10: Exceptional - Deep insights, specific data, compelling narrative
-- 7-8: Strong - Good analysis, mostly complete, some specifics
-- 5-6: Adequate - Covers basics, lacks depth or specificity
-- 3-4: Weak - Superficial, generic, missing key information
-- 1-2: Poor - Incomplete, unhelpful, potentially misleading
-
-Focus on:
-1. Specificity vs. generic statements
-2. Data/evidence backing claims
-3. Logical consistency
-4. Completeness of analysis
-5. Actionable insights for investment decision
-
-Return ONLY the JSON object, no additional text."""
-
-    message = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4000,
-        messages=[
-            {"role": "user", "content": quality_prompt}
-        ]
-    )
-
-    # Parse the JSON response
-    response_text = message.content[0].text
+def parse_quality_response(response_text, memo_filepath=None, prompt_label=None, memo_prompt_version=None):
+    """Parse the analyzer's JSON response and attach report metadata"""
 
     # Extract JSON from response (handle potential markdown code blocks)
     if "```json" in response_text:
@@ -145,30 +61,93 @@ Return ONLY the JSON object, no additional text."""
     quality_report["metadata"] = {
         "analyzed_at": datetime.now().isoformat(),
         "memo_file": memo_filepath,
-        "analyzer_version": "1.0"
+        "analyzer_version": "1.0",
+        "prompt_version": prompt_label,
+        "memo_prompt_version": memo_prompt_version
     }
 
     return quality_report
 
-def generate_quality_report_text(quality_report):
-    """Convert JSON quality report to readable text format"""
+def validate_quality_response(response_text):
+    """
+    None if the analyzer response is usable, else why it should be re-run on a larger model
+    Besides parsing, checks that every section is scored and that the overall score is
+    consistent with the section scores (a cheap confidence check)
+    """
+    try:
+        quality_report = parse_quality_response(response_text)
+    except (ValueError, TypeError) as e:
+        return f"unparseable JSON: {e}"
+    return quality_report_problem(quality_report)
+
+def quality_report_problem(quality_report):
+    """None if a parsed quality report is complete and internally consistent, else why not"""
+    overall = quality_report.get('overall_score')
+    if not isinstance(overall, (int, float)) or not 1 <= overall <= 10:
+        return f"invalid overall_score: {overall!r}"
+    sections = quality_report.get('section_scores') or {}
+    scores = [sections.get(key, {}).get('score') for key in SECTION_KEYS]
+    if not all(isinstance(score, (int, float)) for score in scores):
+        return "missing section scores"
+    if abs(overall - sum(scores) / len(scores)) > CONSISTENCY_TOLERANCE:
+        return f"overall score {overall} inconsistent with section average {sum(scores) / len(scores):.1f}"
+    return None
+
+def analyze_memo_quality(memo_content, memo_filepath=None, prompt_version=None, model=None):
+    """
+    Analyze a deal memo for quality using Claude
+    Returns structured quality assessment with scores and flags
+    The model tier is routed by model_router unless a model is given
+    """
+    prompt = get_prompt('quality_analysis', prompt_version)
+    if model:
+        response_text = complete(prompt.render(memo_content=memo_content), ANALYSIS_MAX_TOKENS, model)
+    else:
+        response_text = complete_routed('quality_analysis', prompt.render(memo_content=memo_content),
+                                        validate_quality_response)
+    return parse_quality_response(response_text, memo_filepath, prompt.label, memo_prompt_label(memo_content))
+
+async def analyze_memo_quality_async(memo_content, memo_filepath=None, prompt_version=None,
+                                     client=None, timeout=DEFAULT_TIMEOUT, model=None):
+    """Async counterpart of analyze_memo_quality; pass a shared AsyncAnthropic client for concurrent jobs"""
+    prompt = get_prompt('quality_analysis', prompt_version)
+    if model:
+        response_text = await complete_async(
+            prompt.render(memo_content=memo_content), ANALYSIS_MAX_TOKENS, model, client=client, timeout=timeout
+        )
+    else:
+        response_text = await complete_routed_async(
+            'quality_analysis', prompt.render(memo_content=memo_content), validate_quality_response,
+            client=client, timeout=timeout
+        )
+    return parse_quality_response(response_text, memo_filepath, prompt.label, memo_prompt_label(memo_content))
 
-    report = []
-    report.append("=" * 70)
-    report.append("DEAL MEMO QUALITY REPORT")
-    report.append("=" * 70)
-    report.append("")
+def iter_quality_report_lines(quality_report):
+    """Yield the readable text report line by line"""
+
+    yield "=" * 70
+    yield "DEAL MEMO QUALITY REPORT"
+    yield "=" * 70
+    yield ""
 
     # Overall assessment
-    report.append(f"OVERALL SCORE: {quality_report['overall_score']}/10")
-    report.append(f"{quality_report['overall_assessment']}")
-    report.append("")
+    yield f"OVERALL SCORE: {quality_report['overall_score']}/10"
+    ensemble = (quality_report.get('metadata') or {}).get('ensemble')
+    if ensemble and ensemble['overall_score']['ci95']:
+        low, high = ensemble['overall_score']['ci95']
+        yield f"Consensus of {ensemble['runs']} analyses, 95% CI {low}-{high}"
+    changes = (quality_report.get('metadata') or {}).get('memo_changes')
+    if changes:
+        changed = ", ".join(s.replace('_', ' ').title() for s in changes['changed_sections']) or "none"
+        yield f"Changed since v{changes['previous_version']}: {changed}"
+    yield f"{quality_report['overall_assessment']}"
+    yield ""
 
     # Section scores
-    report.append("-" * 70)
-    report.append("SECTION-BY-SECTION ANALYSIS")
-    report.append("-" * 70)
-    report.append("")
+    yield "-" * 70
+    yield "SECTION-BY-SECTION ANALYSIS"
+    yield "-" * 70
+    yield ""
 
     for section_name, section_data in quality_report['section_scores'].items():
         section_title = section_name.replace('_', ' ').title()
@@ -185,49 +164,49 @@ def generate_quality_report_text(quality_report):
         else:
             indicator = "✗"
 
-        report.append(f"{indicator} {section_title}: {score}/10 ({completeness})")
+        yield f"{indicator} {section_title}: {score}/10 ({completeness})"
 
         if section_data['strengths']:
-            report.append("   Strengths:")
+            yield "   Strengths:"
             for strength in section_data['strengths']:
-                report.append(f"   + {strength}")
+                yield f"   + {strength}"
 
         if section_data['issues']:
-            report.append("   Issues:")
+            yield "   Issues:"
             for issue in section_data['issues']:
-                report.append(f"   - {issue}")
+                yield f"   - {issue}"
 
-        report.append("")
+        yield ""
 
     # Data verification
-    report.append("-" * 70)
-    report.append("DATA VERIFICATION")
-    report.append("-" * 70)
-    report.append("")
+    yield "-" * 70
+    yield "DATA VERIFICATION"
+    yield "-" * 70
+    yield ""
 
     dv = quality_report['data_verification']
-    report.append(f"Quantitative claims found: {dv['quantitative_claims']}")
-    report.append(f"Claims with sources: {dv['sourced_claims']}")
-    report.append("")
+    yield f"Quantitative claims found: {dv['quantitative_claims']}"
+    yield f"Claims with sources: {dv['sourced_claims']}"
+    yield ""
 
     if dv['unsourced_claims']:
-        report.append("Unsourced claims requiring verification:")
+        yield "Unsourced claims requiring verification:"
         for claim in dv['unsourced_claims']:
-            report.append(f"  • {claim}")
-        report.append("")
+            yield f"  • {claim}"
+        yield ""
 
     if dv['potential_hallucinations']:
-        report.append("Potential hallucinations or unverifiable statements:")
+        yield "Potential hallucinations or unverifiable statements:"
         for concern in dv['potential_hallucinations']:
-            report.append(f"  ⚠ {concern}")
-        report.append("")
+            yield f"  ⚠ {concern}"
+        yield ""
 
     # Red flags
     if quality_report['red_flags']:
-        report.append("-" * 70)
-        report.append("RED FLAGS")
-        report.append("-" * 70)
-        report.append("")
+        yield "-" * 70
+        yield "RED FLAGS"
+        yield "-" * 70
+        yield ""
 
         for flag in quality_report['red_flags']:
             severity_icon = {
@@ -237,26 +216,28 @@ def generate_quality_report_text(quality_report):
                 'low': '🟢'
             }.get(flag['severity'], '⚪')
 
-            report.append(f"{severity_icon} [{flag['severity'].upper()}] {flag['category'].replace('_', ' ').title()}")
-            report.append(f"   Location: {flag['location']}")
-            report.append(f"   {flag['description']}")
-            report.append("")
+            yield f"{severity_icon} [{flag['severity'].upper()}] {flag['category'].replace('_', ' ').title()}"
+            yield f"   Location: {flag['location']}"
+            yield f"   {flag['description']}"
+            yield ""
 
     # Improvement priorities
-    report.append("-" * 70)
-    report.append("IMPROVEMENT PRIORITIES")
-    report.append("-" * 70)
-    report.append("")
+    yield "-" * 70
+    yield "IMPROVEMENT PRIORITIES"
+    yield "-" * 70
+    yield ""
 
     sorted_priorities = sorted(quality_report['improvement_priorities'], key=lambda x: x['priority'])
     for item in sorted_priorities:
-        report.append(f"{item['priority']}. [{item['section']}]")
-        report.append(f"   {item['recommendation']}")
-        report.append("")
+        yield f"{item['priority']}. [{item['section']}]"
+        yield f"   {item['recommendation']}"
+        yield ""
 
-    report.append("=" * 70)
+    yield "=" * 70
 
-    return "\n".join(report)
+def generate_quality_report_text(quality_report):
+    """Convert JSON quality report to readable text format"""
+    return "\n".join(iter_quality_report_lines(quality_report))
 
 def save_quality_report(quality_report, memo_filepath):
     """Save quality report as JSON and text files"""
@@ -280,17 +261,17 @@ def save_quality_report(quality_report, memo_filepath):
 
     return json_filepath, txt_filepath
 
-def main():
-    """Main function to analyze a memo file"""
+def main(memo_filepath=None, prompt_version=None, ensemble_runs=None, tolerance=None, model=None):
+    """Main function to analyze a memo file (ensemble_runs > 1 runs a consensus analysis)"""
 
     print("=" * 70)
     print("DEAL MEMO QUALITY ANALYZER")
     print("=" * 70)
     print()
 
-    if len(sys.argv) > 1:
+    if not memo_filepath and len(sys.argv) > 1:
         memo_filepath = sys.argv[1]
-    else:
+    if not memo_filepath:
         memo_filepath = input("Enter path to deal memo file (.md): ").strip()
 
     if not os.path.exists(memo_filepath):
@@ -299,22 +280,50 @@ def main():
 
     print(f"📄 Reading memo: {memo_filepath}")
 
-    with open(memo_filepath, 'r') as f:
-        memo_content = f.read()
+    memo_content = read_memo(memo_filepath)
 
     print("🔍 Analyzing memo quality with AI...")
     print("   This may take 30-60 seconds...")
     print()
 
-    quality_report = analyze_memo_quality(memo_content, memo_filepath)
+    if ensemble_runs and ensemble_runs > 1:
+        import analysis_ensemble
+        options = {'max_runs': ensemble_runs}
+        if tolerance is not None:
+            options['tolerance'] = tolerance
+        if model:
+            options['model'] = model
+        quality_report = analysis_ensemble.analyze_memo_ensemble(memo_content, memo_filepath, prompt_version, **options)
+        ensemble = quality_report['metadata']['ensemble']
+        if ensemble['probe']['accepted']:
+            print(f"🎯 Single {ensemble['probe']['model']} analysis passed its confidence check; no ensemble needed")
+        else:
+            print(f"🎯 Consensus from {ensemble['runs']} run(s) with {ensemble['model']}"
+                  f"{'' if ensemble['agreed'] else ' (scores did not agree within tolerance)'}")
+        print()
+    else:
+        quality_report = analyze_memo_quality(memo_content, memo_filepath, prompt_version, model)
+
+    # Note which sections changed since the company's previous memo version (if memos are tracked)
+    import company_registry
+    import memo_versions
+    registry = company_registry.connect_existing()
+    if registry is not None:
+        memo_versions.annotate_quality_report(registry, quality_report, memo_filepath)
 
     print("💾 Saving quality report...")
     json_file, txt_file = save_quality_report(quality_report, memo_filepath)
 
+    # Keep the company registry pointing at the latest report for this memo
+    if registry is not None:
+        company_registry.record_quality(registry, memo_filepath, json_file, quality_report.get('overall_score'))
+
     print()
     print("✅ Quality analysis complete!")
     print(f"📊 JSON report: {json_file}")
     print(f"📋 Text report: {txt_file}")
+    if routing_summary():
+        print(routing_summary())
     print()
 
     # Display summary
@@ -0,0 +1,282 @@
+"""
+Quality Archive
+Compact segment files for storing many quality reports
+
+Segment layout (.qar):
+    header   MAGIC + format version
+    rows     one zlib-compressed JSON report per memo
+    columns  one zlib-compressed block per column (section scores, completeness,
+             red flags, improvement priorities, metadata)
+    index    zlib-compressed JSON with the offset/length of every row and column
+    footer   index offset + MAGIC
+
+Reading one memo's report or one column seeks straight to its block and
+decompresses only that block.
+"""
+
+import os
+import re
+import json
+import math
+import struct
+import zlib
+from array import array
+from itertools import chain, islice
+
+from quality_analyzer import SECTION_KEYS
+
+MAGIC = b"QARC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sH")
+FOOTER = struct.Struct("<Q4s")
+DEFAULT_SEGMENT_SIZE = 5000
+
+# Column name -> (encoding, function extracting the value from a report)
+COLUMNS = {
+    'memo_file': ('dict', lambda r: r.get('metadata', {}).get('memo_file')),
+    'analyzed_at': ('dict', lambda r: r.get('metadata', {}).get('analyzed_at')),
+    'prompt_version': ('dict', lambda r: r.get('metadata', {}).get('prompt_version')),
+    'overall_score': ('float64', lambda r: r.get('overall_score')),
+    'red_flags': ('json', lambda r: r.get('red_flags', [])),
+    'improvement_priorities': ('json', lambda r: r.get('improvement_priorities', [])),
+}
+for _key in SECTION_KEYS:
+    COLUMNS[_key] = ('float64', lambda r, key=_key: r.get('section_scores', {}).get(key, {}).get('score'))
+    COLUMNS[f"{_key}_completeness"] = (
+        'dict', lambda r, key=_key: r.get('section_scores', {}).get(key, {}).get('completeness')
+    )
+
+
+def _compress_json(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def _decompress_json(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+# Score columns are stored as doubles so they read back exactly as written (6.7, not 6.6999998);
+# 'float32' is still read for segments written before that
+FLOAT_TYPECODES = {'float64': 'd', 'float32': 'f'}
+
+
+def _encode_column(encoding, values):
+    if encoding in FLOAT_TYPECODES:
+        numbers = array(FLOAT_TYPECODES[encoding], [math.nan if v is None else float(v) for v in values])
+        return zlib.compress(numbers.tobytes(), 9)
+    if encoding == 'dict':
+        # Dictionary-encode repetitive strings (completeness, prompt versions)
+        lookup = {}
+        codes = [lookup.setdefault(v, len(lookup)) for v in values]
+        return _compress_json({'values': list(lookup), 'codes': codes})
+    return _compress_json(values)
+
+
+def _decode_column(encoding, data):
+    if encoding in FLOAT_TYPECODES:
+        numbers = array(FLOAT_TYPECODES[encoding])
+        numbers.frombytes(zlib.decompress(data))
+        return [None if math.isnan(n) else (int(n) if n.is_integer() else n) for n in numbers]
+    if encoding == 'dict':
+        block = _decompress_json(data)
+        return [block['values'][code] for code in block['codes']]
+    return _decompress_json(data)
+
+
+def report_key(source, quality_report):
+    """Archive key of a report: its memo file name, or the source path if it has none"""
+    return quality_report.get('metadata', {}).get('memo_file') or source
+
+
+def write_segment(filepath, reports):
+    """
+    Write (source, quality_report) pairs to one segment file
+    Returns the number of reports written
+    """
+    rows = []
+    column_values = {name: [] for name in COLUMNS}
+
+    tmp_path = f"{filepath}.tmp"
+    try:
+        count = _write_segment_file(tmp_path, reports, rows, column_values)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, filepath)
+    return count
+
+
+def _write_segment_file(tmp_path, reports, rows, column_values):
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+
+        for source, quality_report in reports:
+            block = _compress_json(quality_report)
+            key = report_key(source, quality_report)
+            rows.append({'key': key, 'source': source, 'offset': f.tell(), 'length': len(block)})
+            f.write(block)
+
+            for name, (_, extract) in COLUMNS.items():
+                column_values[name].append(extract(quality_report))
+
+        columns = {}
+        for name, (encoding, _) in COLUMNS.items():
+            block = _encode_column(encoding, column_values[name])
+            columns[name] = {'encoding': encoding, 'offset': f.tell(), 'length': len(block)}
+            f.write(block)
+
+        index_offset = f.tell()
+        f.write(_compress_json({'count': len(rows), 'rows': rows, 'columns': columns}))
+        f.write(FOOTER.pack(index_offset, MAGIC))
+    return len(rows)
+
+
+class QualityArchive:
+    """Reader for one segment file"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+
+        magic, version = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a quality archive segment (v{FORMAT_VERSION}): {filepath}")
+
+        self._file.seek(-FOOTER.size, os.SEEK_END)
+        footer_start = self._file.tell()
+        index_offset, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Truncated quality archive segment: {filepath}")
+
+        self._index = _decompress_json(self._read(index_offset, footer_start - index_offset))
+        self._positions = {row['key']: i for i, row in enumerate(self._index['rows'])}
+
+    def _read(self, offset, length):
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def __len__(self):
+        return self._index['count']
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def keys(self):
+        """Memo file names (or source paths) in storage order"""
+        return [row['key'] for row in self._index['rows']]
+
+    def columns(self):
+        return list(self._index['columns'])
+
+    def get(self, key):
+        """Return one memo's full quality report by memo file name or row number"""
+        position = key if isinstance(key, int) else self._positions.get(key)
+        if position is None:
+            raise KeyError(key)
+        row = self._index['rows'][position]
+        return _decompress_json(self._read(row['offset'], row['length']))
+
+    def column(self, name):
+        """Return every value of one column, e.g. column('business_model') for all its scores"""
+        if name not in self._index['columns']:
+            raise KeyError(f"Unknown column: {name} (available: {', '.join(self.columns())})")
+        info = self._index['columns'][name]
+        return _decode_column(info['encoding'], self._read(info['offset'], info['length']))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_quality_json(json_filepaths, errors=None):
+    """
+    Yield (source, quality_report) pairs from *_quality.json files
+    With an errors list, unreadable files are skipped and recorded there as (source, message)
+    """
+    for filepath in json_filepaths:
+        try:
+            with open(filepath, 'r') as f:
+                quality_report = json.load(f)
+            if not isinstance(quality_report, dict):
+                raise ValueError("not a quality report (expected a JSON object)")
+        except (OSError, ValueError) as e:
+            if errors is None:
+                raise
+            errors.append((filepath, f"{type(e).__name__}: {e}"))
+            continue
+        yield filepath, quality_report
+
+
+def convert_reports(json_filepaths, output_dir, segment_size=DEFAULT_SEGMENT_SIZE, prefix="quality_archive",
+                    errors=None, outdated=None):
+    """
+    Pack *_quality.json files into numbered segment files of up to segment_size reports
+    New segments are numbered after the highest existing one. Memos already archived in
+    output_dir are skipped, even if their report was re-analyzed since: archived reports are
+    never replaced, and those newer reports are listed in `outdated` as (source, memo key)
+    Unreadable files are skipped and listed in `errors` as (source, message)
+    Returns the list of (segment path, report count)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    segment_name = re.compile(rf"^{re.escape(prefix)}_(\d+)\.qar$")
+    numbers = [int(match.group(1)) for match in map(segment_name.match, os.listdir(output_dir)) if match]
+    segment_number = max(numbers, default=0)
+
+    archived = {}  # memo key -> analyzed_at of the archived report
+    for number in numbers:
+        with QualityArchive(os.path.join(output_dir, f"{prefix}_{number:05d}.qar")) as archive:
+            archived.update(zip(archive.keys(), archive.column('analyzed_at')))
+
+    errors = [] if errors is None else errors
+    outdated = [] if outdated is None else outdated
+
+    def new_reports():
+        for source, quality_report in iter_quality_json(json_filepaths, errors):
+            key = report_key(source, quality_report)
+            if key not in archived:
+                archived[key] = quality_report.get('metadata', {}).get('analyzed_at')
+                yield source, quality_report
+            elif (quality_report.get('metadata', {}).get('analyzed_at') or "") > (archived[key] or ""):
+                outdated.append((source, key))
+
+    segments = []
+    reports = new_reports()
+    for first in reports:
+        segment_number += 1
+        filepath = os.path.join(output_dir, f"{prefix}_{segment_number:05d}.qar")
+        count = write_segment(filepath, chain([first], islice(reports, segment_size - 1)))
+        segments.append((filepath, count))
+    return segments
+
+
+def find_segments(paths):
+    """Expand files and directories into .qar segment paths"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".qar")))
+        else:
+            found.append(path)
+    return found
+
+
+def scan_column(segment_paths, name):
+    """Yield (memo key, value) for one column across segments"""
+    for filepath in segment_paths:
+        with QualityArchive(filepath) as archive:
+            yield from zip(archive.keys(), archive.column(name))
+
+
+def find_report(segment_paths, key):
+    """Return the quality report for a memo from whichever segment holds it, or None"""
+    for filepath in segment_paths:
+        with QualityArchive(filepath) as archive:
+            if key in archive:
+                return archive.get(key)
+    return None
@@ -0,0 +1,74 @@
+"""
+Registry DB
+Connection and schema for the company registry and memo version tables in memo_jobs.db
+
+company_registry.py and memo_versions.py both work on these tables; keeping the
+schema here lets either one open the database without importing the other.
+"""
+
+import sqlite3
+
+DEFAULT_DB_PATH = "memo_jobs.db"
+
+COMPANY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    company_key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    company_data TEXT,
+    fetched_at REAL,
+    memo_file TEXT,
+    prompt_version TEXT,
+    memo_at REAL,
+    quality_json TEXT,
+    overall_score REAL,
+    analyzed_at REAL
+);
+CREATE INDEX IF NOT EXISTS companies_memo_file ON companies (memo_file);
+CREATE TABLE IF NOT EXISTS company_aliases (
+    input_key TEXT PRIMARY KEY,
+    company_key TEXT NOT NULL,
+    resolved_at REAL NOT NULL
+);
+"""
+
+MEMO_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memo_versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    memo_file TEXT NOT NULL UNIQUE,
+    prompt_version TEXT,
+    created_at REAL NOT NULL,
+    quality_json TEXT,
+    overall_score REAL,
+    UNIQUE (company_key, version)
+);
+CREATE TABLE IF NOT EXISTS memo_sections (
+    version_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    section_hash TEXT NOT NULL,
+    chunk_hashes TEXT NOT NULL,
+    score REAL,
+    PRIMARY KEY (version_id, section)
+);
+CREATE TABLE IF NOT EXISTS memo_chunks (
+    hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+"""
+
+
+def ensure_schema(conn):
+    conn.executescript(COMPANY_SCHEMA)
+    conn.executescript(MEMO_VERSION_SCHEMA)
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Open the registry database (shared with the job queue by default)"""
+    # The async pipeline hands the connection to worker threads (one call at a time)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_schema(conn)
+    return conn
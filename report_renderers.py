@@ -0,0 +1,273 @@
+"""
+Report Renderers
+Re-render existing *_quality.json reports as text, markdown, HTML or CSV summary rows
+without calling the API
+"""
+
+import os
+import csv
+import glob
+import html
+import json
+from functools import partial
+
+from quality_analyzer import SECTION_KEYS, iter_quality_report_lines
+
+RENDERERS = {}
+
+CSV_FIELDS = [
+    "source",
+    "memo_file",
+    "analyzed_at",
+    "prompt_version",
+    "overall_score"
+] + [f"{key}_score" for key in SECTION_KEYS] + [
+    "red_flags",
+    "critical_flags",
+    "unsourced_claims",
+    "potential_hallucinations"
+]
+
+
+def register_renderer(name, suffix):
+    """Register a function that yields the lines of a rendered report"""
+    def decorator(func):
+        RENDERERS[name] = {'render': func, 'suffix': suffix}
+        return func
+    return decorator
+
+
+@register_renderer("text", "_quality.txt")
+def render_text(quality_report):
+    return iter_quality_report_lines(quality_report)
+
+
+@register_renderer("markdown", "_quality.markdown")
+def render_markdown(quality_report):
+    memo_file = quality_report.get('metadata', {}).get('memo_file')
+    yield f"# Deal Memo Quality Report{f': {memo_file}' if memo_file else ''}"
+    yield ""
+    yield f"**Overall Score:** {quality_report['overall_score']}/10"
+    yield ""
+    yield quality_report['overall_assessment']
+    yield ""
+
+    yield "## Section Scores"
+    yield ""
+    yield "| Section | Score | Completeness |"
+    yield "|---------|-------|--------------|"
+    for section_name, section_data in quality_report['section_scores'].items():
+        section_title = section_name.replace('_', ' ').title()
+        yield f"| {section_title} | {section_data['score']}/10 | {section_data['completeness']} |"
+    yield ""
+
+    for section_name, section_data in quality_report['section_scores'].items():
+        if not section_data['strengths'] and not section_data['issues']:
+            continue
+        yield f"### {section_name.replace('_', ' ').title()}"
+        yield ""
+        for strength in section_data['strengths']:
+            yield f"- ✅ {strength}"
+        for issue in section_data['issues']:
+            yield f"- ⚠️ {issue}"
+        yield ""
+
+    dv = quality_report['data_verification']
+    yield "## Data Verification"
+    yield ""
+    yield f"- Quantitative claims found: {dv['quantitative_claims']}"
+    yield f"- Claims with sources: {dv['sourced_claims']}"
+    for claim in dv['unsourced_claims']:
+        yield f"- Unsourced: {claim}"
+    for concern in dv['potential_hallucinations']:
+        yield f"- Potential hallucination: {concern}"
+    yield ""
+
+    if quality_report['red_flags']:
+        yield "## Red Flags"
+        yield ""
+        for flag in quality_report['red_flags']:
+            yield (f"- **{flag['severity'].upper()}** {flag['category'].replace('_', ' ').title()} "
+                   f"({flag['location']}): {flag['description']}")
+        yield ""
+
+    yield "## Improvement Priorities"
+    yield ""
+    for item in sorted(quality_report['improvement_priorities'], key=lambda x: x['priority']):
+        yield f"{item['priority']}. **{item['section']}**: {item['recommendation']}"
+
+
+@register_renderer("html", "_quality.html")
+def render_html(quality_report):
+    esc = html.escape
+    memo_file = quality_report.get('metadata', {}).get('memo_file') or ""
+    yield "<!DOCTYPE html>"
+    yield "<html>"
+    yield "<head>"
+    yield '<meta charset="utf-8">'
+    yield f"<title>Quality Report {esc(memo_file)}</title>"
+    yield "<style>body{font-family:sans-serif;max-width:900px;margin:2em auto}" \
+          "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px}" \
+          ".good{color:#2e7d32}.ok{color:#f9a825}.bad{color:#c62828}</style>"
+    yield "</head>"
+    yield "<body>"
+    yield "<h1>Deal Memo Quality Report</h1>"
+    if memo_file:
+        yield f"<p><em>{esc(memo_file)}</em></p>"
+    yield f"<h2>Overall Score: {esc(str(quality_report['overall_score']))}/10</h2>"
+    yield f"<p>{esc(quality_report['overall_assessment'])}</p>"
+
+    yield "<h2>Section Scores</h2>"
+    yield "<table>"
+    yield "<tr><th>Section</th><th>Score</th><th>Completeness</th><th>Strengths</th><th>Issues</th></tr>"
+    for section_name, section_data in quality_report['section_scores'].items():
+        score = section_data['score']
+        css_class = "good" if score >= 8 else "ok" if score >= 5 else "bad"
+        strengths = "<br>".join(esc(s) for s in section_data['strengths'])
+        issues = "<br>".join(esc(i) for i in section_data['issues'])
+        yield (f'<tr><td>{esc(section_name.replace("_", " ").title())}</td>'
+               f'<td class="{css_class}">{esc(str(score))}/10</td>'
+               f"<td>{esc(section_data['completeness'])}</td><td>{strengths}</td><td>{issues}</td></tr>")
+    yield "</table>"
+
+    dv = quality_report['data_verification']
+    yield "<h2>Data Verification</h2>"
+    yield f"<p>Quantitative claims found: {esc(str(dv['quantitative_claims']))}, " \
+          f"with sources: {esc(str(dv['sourced_claims']))}</p>"
+    if dv['unsourced_claims'] or dv['potential_hallucinations']:
+        yield "<ul>"
+        for claim in dv['unsourced_claims']:
+            yield f"<li>Unsourced: {esc(claim)}</li>"
+        for concern in dv['potential_hallucinations']:
+            yield f"<li>Potential hallucination: {esc(concern)}</li>"
+        yield "</ul>"
+
+    if quality_report['red_flags']:
+        yield "<h2>Red Flags</h2>"
+        yield "<ul>"
+        for flag in quality_report['red_flags']:
+            yield (f"<li><strong>{esc(flag['severity'].upper())}</strong> "
+                   f"{esc(flag['category'].replace('_', ' ').title())} ({esc(flag['location'])}): "
+                   f"{esc(flag['description'])}</li>")
+        yield "</ul>"
+
+    yield "<h2>Improvement Priorities</h2>"
+    yield "<ol>"
+    for item in sorted(quality_report['improvement_priorities'], key=lambda x: x['priority']):
+        yield f"<li><strong>{esc(item['section'])}</strong>: {esc(item['recommendation'])}</li>"
+    yield "</ol>"
+    yield "</body>"
+    yield "</html>"
+
+
+def summary_row(quality_report, source):
+    """Flatten a quality report into one CSV summary row"""
+    metadata = quality_report.get('metadata', {})
+    sections = quality_report.get('section_scores', {})
+    dv = quality_report.get('data_verification', {})
+    flags = quality_report.get('red_flags', [])
+
+    row = {
+        'source': source,
+        'memo_file': metadata.get('memo_file'),
+        'analyzed_at': metadata.get('analyzed_at'),
+        'prompt_version': metadata.get('prompt_version'),
+        'overall_score': quality_report.get('overall_score')
+    }
+    for key in SECTION_KEYS:
+        row[f"{key}_score"] = sections.get(key, {}).get('score')
+    row['red_flags'] = len(flags)
+    row['critical_flags'] = sum(1 for flag in flags if flag.get('severity') == 'critical')
+    row['unsourced_claims'] = len(dv.get('unsourced_claims', []))
+    row['potential_hallucinations'] = len(dv.get('potential_hallucinations', []))
+    return row
+
+
+def write_lines(filepath, lines):
+    """Write lines as they are produced, without building the whole report in memory"""
+    with open(filepath, 'w') as f:
+        for i, line in enumerate(lines):
+            if i:
+                f.write("\n")
+            f.write(line)
+
+
+def output_path(json_filepath, suffix, output_dir=None):
+    """Map deal_memo_x_quality.json to deal_memo_x<suffix> in output_dir (default: alongside)"""
+    base_name = os.path.basename(json_filepath)
+    if base_name.endswith("_quality.json"):
+        base_name = base_name[:-len("_quality.json")]
+    else:
+        base_name = os.path.splitext(base_name)[0]
+    directory = output_dir or os.path.dirname(json_filepath)
+    return os.path.join(directory, f"{base_name}{suffix}")
+
+
+def render_file(json_filepath, formats, output_dir=None):
+    """Render one quality report to every requested file format; returns its CSV summary row"""
+    try:
+        with open(json_filepath, 'r') as f:
+            quality_report = json.load(f)
+
+        outputs = []
+        for name in formats:
+            renderer = RENDERERS[name]
+            filepath = output_path(json_filepath, renderer['suffix'], output_dir)
+            write_lines(filepath, renderer['render'](quality_report))
+            outputs.append(filepath)
+
+        return {'source': json_filepath, 'outputs': outputs, 'row': summary_row(quality_report, json_filepath)}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return {'source': json_filepath, 'error': f"{type(e).__name__}: {e}"}
+
+
+def find_quality_reports(paths):
+    """Expand files, directories and glob patterns into *_quality.json paths"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, "*_quality.json"))))
+        elif any(ch in path for ch in "*?["):
+            found.extend(sorted(glob.glob(path)))
+        else:
+            found.append(path)
+    return found
+
+
+def render_reports(json_filepaths, formats, output_dir=None, csv_path=None, workers=None, chunksize=16):
+    """
+    Render many quality reports across a process pool
+    Yields one result per report as it completes; CSV summary rows are appended as they arrive
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    unknown = [name for name in formats if name not in RENDERERS]
+    if unknown:
+        raise ValueError(f"Unknown format(s): {', '.join(unknown)} (available: {', '.join(sorted(RENDERERS))})")
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    worker = partial(render_file, formats=formats, output_dir=output_dir)
+    csv_file = open(csv_path, 'w', newline='') if csv_path else None
+    writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS) if csv_file else None
+    if writer:
+        writer.writeheader()
+
+    executor = None
+    try:
+        if workers == 1:
+            results = map(worker, json_filepaths)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            results = executor.map(worker, json_filepaths, chunksize=chunksize)
+
+        for result in results:
+            if writer and 'row' in result:
+                writer.writerow(result['row'])
+            yield result
+    finally:
+        if executor:
+            executor.shutdown()
+        if csv_file:
+            csv_file.close()
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import analysis_ensemble
+from quality_analyzer import SECTION_KEYS
+
+
+def report(overall, **sections):
+    return {
+        'overall_score': overall,
+        'section_scores': {name: {'score': score, 'completeness': 'complete', 'strengths': [], 'issues': []}
+                           for name, score in sections.items()},
+    }
+
+
+def full_report(overall, section_score):
+    return report(overall, **dict.fromkeys(SECTION_KEYS, section_score))
+
+
+def run_ensemble(monkeypatch, results, calls=None, **kwargs):
+    """Run the ensemble on canned results; the probe is skipped unless probe_model is given"""
+    results = iter(results)
+    kwargs.setdefault('probe_model', None)
+
+    async def fake_analyze(*args, **kw):
+        if calls is not None:
+            calls.append(args[5])
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    monkeypatch.setattr(analysis_ensemble, 'analyze_memo_quality_async', fake_analyze)
+    return asyncio.run(analysis_ensemble.analyze_memo_ensemble_async("memo", client=object(), **kwargs))
+
+
+def test_stats_use_sections_from_every_report():
+    stats = analysis_ensemble.ensemble_stats([report(7, market_analysis=6), report(8, market_analysis=7, business_model=5)])
+    assert set(stats['sections']) == {'market_analysis', 'business_model'}
+    assert stats['sections']['business_model']['scores'] == [5]
+    assert stats['overall_score']['mean'] == 7.5
+
+
+def test_consensus_keeps_sections_missing_from_chosen_run():
+    reports = [report(7, market_analysis=6), report(8, market_analysis=7, business_model=5)]
+    consensus = analysis_ensemble.consensus_report(reports, analysis_ensemble.ensemble_stats(reports))
+    assert consensus['section_scores']['business_model']['score'] == 5
+
+
+def test_invalid_samples_are_dropped(monkeypatch):
+    results = [report(7, market_analysis=6), {'section_scores': {}}, report("high"), report(7.5, market_analysis=6)]
+    consensus = run_ensemble(monkeypatch, results, max_runs=4, wave_size=2)
+    ensemble = consensus['metadata']['ensemble']
+    assert (ensemble['runs'], ensemble['failed_runs']) == (2, 2)
+    assert ensemble['overall_score']['scores'] == [7, 7.5]
+    assert consensus['overall_score'] == 7.2
+
+
+def test_stops_early_when_scores_agree(monkeypatch):
+    consensus = run_ensemble(monkeypatch, [report(7), report(7)] * 3, max_runs=6, wave_size=2)
+    assert consensus['metadata']['ensemble']['runs'] == 2
+    assert consensus['metadata']['ensemble']['stopped_early']
+
+
+def test_all_invalid_samples_raise(monkeypatch):
+    with pytest.raises(RuntimeError):
+        run_ensemble(monkeypatch, [RuntimeError("api down"), report(None)], max_runs=2, wave_size=2)
+
+
+def test_consistent_probe_costs_one_call(monkeypatch):
+    calls = []
+    consensus = run_ensemble(monkeypatch, [full_report(7, 7)] * 3, calls, probe_model='standard')
+    ensemble = consensus['metadata']['ensemble']
+    assert calls == ['standard']
+    assert (ensemble['runs'], ensemble['model'], ensemble['probe']['accepted']) == (1, 'standard', True)
+    assert consensus['overall_score'] == 7
+
+
+def test_inconsistent_probe_widens_to_ensemble(monkeypatch):
+    calls = []
+    results = [full_report(9, 4), full_report(6, 6), full_report(6.5, 6)]
+    consensus = run_ensemble(monkeypatch, results, calls, probe_model='standard', model='fast')
+    ensemble = consensus['metadata']['ensemble']
+    assert calls == ['standard', 'fast', 'fast']
+    assert ensemble['probe']['accepted'] is False
+    assert 'inconsistent' in ensemble['probe']['reason']
+    assert ensemble['overall_score']['scores'] == [6, 6.5]
+    assert (ensemble['model'], ensemble['agreed']) == ('fast', True)
+
+
+def test_failed_probe_widens_to_ensemble(monkeypatch):
+    results = [RuntimeError("timeout"), full_report(7, 7), full_report(7, 7)]
+    ensemble = run_ensemble(monkeypatch, results, probe_model='standard')['metadata']['ensemble']
+    assert ensemble['probe']['reason'] == "RuntimeError: timeout"
+    assert ensemble['runs'] == 2
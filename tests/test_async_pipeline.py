@@ -0,0 +1,38 @@
+import asyncio
+
+import async_pipeline
+import company_registry
+import memo_versions
+
+
+def test_batch_analyzes_saved_memo_and_records_it(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analyzed = []
+
+    async def fake_fetch(url, http_client):
+        return {'url': url, 'title': "Acme", 'content': "Anvils"}
+
+    async def fake_generate(company_data, prompt_version, client, timeout):
+        return "## Executive Summary\n\nAcme sells anvils."
+
+    async def fake_analyze(memo_content, memo_filepath, client=None, timeout=None):
+        analyzed.append(memo_content)
+        return {'overall_score': 7, 'section_scores': {'executive_summary': {'score': 7}}}
+
+    monkeypatch.setattr(async_pipeline, 'fetch_website_content_async', fake_fetch)
+    monkeypatch.setattr(async_pipeline, 'generate_deal_memo_async', fake_generate)
+    monkeypatch.setattr(async_pipeline, 'analyze_memo_quality_async', fake_analyze)
+    monkeypatch.setattr(async_pipeline, 'save_quality_report',
+                        lambda report, memo_file: (memo_file[:-3] + "_quality.json", memo_file[:-3] + "_quality.txt"))
+
+    registry = company_registry.connect(str(tmp_path / "memo_jobs.db"))
+    result = asyncio.run(async_pipeline.process_company_async(
+        "https://acme.io", None, None, asyncio.Semaphore(1), registry=registry, company_key="acme.io"
+    ))
+
+    assert 'error' not in result, result.get('error')
+    assert "*Prompt: deal_memo@v" in analyzed[0]
+    assert analyzed[0].endswith("Acme sells anvils.")
+    assert company_registry.get_company(registry, "acme.io")['overall_score'] == 7
+    assert memo_versions.get_version(registry, result['memo_file'])['overall_score'] == 7
+    registry.close()
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+import cassette
+
+
+@pytest.fixture
+def use(tmp_path, monkeypatch):
+    path = str(tmp_path / "run.cassette")
+
+    def use_mode(mode):
+        monkeypatch.setenv(cassette.CASSETTE_ENV, path)
+        monkeypatch.setenv(cassette.MODE_ENV, mode)
+        cassette._reset()
+        return path
+    yield use_mode
+    cassette._reset()
+
+
+def not_called():
+    raise AssertionError("replay must not run the live call")
+
+
+def test_record_then_replay(use):
+    use("record")
+    assert cassette.call('llm', {'model': "m", 'messages': [{'content': "hi"}]}, lambda: {'text': "hello"}) == {'text': "hello"}
+    assert cassette.call('http', {'method': 'GET', 'url': "https://acme.io"}, lambda: b"<html>\xff</html>") == b"<html>\xff</html>"
+
+    use("replay")
+    assert cassette.call('llm', {'model': "m", 'messages': [{'content': "hi"}]}, not_called) == {'text': "hello"}
+    assert cassette.call('http', {'method': 'GET', 'url': "https://acme.io"}, not_called) == b"<html>\xff</html>"
+
+
+def test_identical_requests_replay_in_order(use):
+    use("record")
+    for value in ("first", "second"):
+        cassette.call('llm', {'prompt': "same"}, lambda: value)
+
+    use("replay")
+    assert [cassette.call('llm', {'prompt': "same"}, not_called) for _ in range(3)] == ["first", "second", "second"]
+
+
+def test_generated_timestamp_does_not_change_key():
+    request = {'messages': [{'content': "# Memo\n\n*Generated: November 20, 2025 at 10:15 AM*\n\nBody"}]}
+    later = {'messages': [{'content': "# Memo\n\n*Generated: December 1, 2025 at 09:00 AM*\n\nBody"}]}
+    assert cassette.request_key('llm', request) == cassette.request_key('llm', later)
+    assert cassette.request_key('llm', request) != cassette.request_key('http', request)
+
+
+def test_replay_miss_raises(use):
+    use("record")
+    cassette.call('llm', {'prompt': "recorded"}, lambda: "ok")
+    use("replay")
+    with pytest.raises(cassette.CassetteMiss):
+        cassette.call('llm', {'prompt': "never recorded"}, not_called)
+
+
+def test_recorded_errors_are_raised_again(use):
+    class ApiError(Exception):
+        pass
+
+    def timeout():
+        raise TimeoutError("too slow")
+
+    def api_error():
+        raise ApiError("overloaded")
+
+    use("record")
+    with pytest.raises(TimeoutError):
+        cassette.call('http', {'url': "https://slow.io"}, timeout)
+    with pytest.raises(ApiError):
+        cassette.call('llm', {'prompt': "busy"}, api_error)
+
+    use("replay")
+    with pytest.raises(TimeoutError, match="too slow"):
+        cassette.call('http', {'url': "https://slow.io"}, not_called)
+    with pytest.raises(cassette.ReplayedError, match="overloaded"):
+        cassette.call('llm', {'prompt': "busy"}, not_called)
+
+
+def test_async_replay(use):
+    async def live():
+        return "async result"
+
+    async def not_awaited():
+        raise AssertionError("replay must not run the live call")
+
+    use("record")
+    assert asyncio.run(cassette.call_async('llm', {'prompt': "a"}, live)) == "async result"
+    use("replay")
+    assert asyncio.run(cassette.call_async('llm', {'prompt': "a"}, not_awaited)) == "async result"
+
+
+def test_summary_counts_interactions(use):
+    path = use("record")
+    cassette.call('llm', {'prompt': "a"}, lambda: 1)
+    cassette.call('llm', {'prompt': "a"}, lambda: 2)
+    cassette.call('http', {'url': "https://acme.io"}, lambda: b"")
+    summary = cassette.cassette_summary(path)
+    assert summary['kinds'] == {'http': {'interactions': 1, 'requests': 1}, 'llm': {'interactions': 2, 'requests': 1}}
+
+
+def test_website_fetch_miss_fails_replay(use):
+    import company_registry
+    import deal_memo_generator
+
+    use("record")
+    html = b"<html><head><title>Acme</title></head><body><p>Anvils for everyone.</p></body></html>"
+    cassette.call('http', {'method': 'GET', 'url': "https://acme.io"}, lambda: html)
+
+    use("replay")
+    company_data = deal_memo_generator.fetch_website_content("https://acme.io")
+    assert 'error' not in company_data
+    assert "Anvils" in company_data['content']
+    with pytest.raises(cassette.CassetteMiss):
+        deal_memo_generator.fetch_website_content("https://unknown.io")
+    with pytest.raises(cassette.CassetteMiss):
+        company_registry.follow_redirects("https://unknown.io")
+
+
+def test_async_website_fetch_miss_fails_replay(use):
+    pytest.importorskip("httpx")
+    import deal_memo_generator
+
+    use("record")
+    cassette.call('http', {'method': 'GET', 'url': "https://acme.io"}, lambda: b"<html></html>")
+    use("replay")
+    with pytest.raises(cassette.CassetteMiss):
+        asyncio.run(deal_memo_generator.fetch_website_content_async("https://unknown.io", http_client=object()))
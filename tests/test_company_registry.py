@@ -0,0 +1,52 @@
+import os
+
+import company_registry
+import memo_versions
+
+
+def test_canonical_company_key():
+    for url in ("stripe.com", "https://www.stripe.com/", "http://Stripe.com:443/pricing", "stripe.com."):
+        assert company_registry.canonical_company_key(url) == "stripe.com"
+
+
+def test_connect_existing_does_not_create_database(tmp_path):
+    db_path = str(tmp_path / "memo_jobs.db")
+    assert company_registry.connect_existing(db_path) is None
+    assert not os.path.exists(db_path)
+
+    company_registry.connect(db_path).close()
+    conn = company_registry.connect_existing(db_path)
+    assert conn is not None
+    conn.close()
+
+
+def test_quality_matches_memo_by_absolute_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "deal_memo_acme.md").write_text("## Executive Summary\n\nAcme sells anvils.\n")
+    conn = company_registry.connect(str(tmp_path / "memo_jobs.db"))
+
+    company_registry.record_memo(conn, "acme.io", "https://acme.io", "deal_memo_acme.md", "deal_memo@v1")
+    company_registry.record_quality(conn, "./deal_memo_acme.md", "deal_memo_acme_quality.json", 7.5)
+
+    company = company_registry.get_company(conn, "acme.io")
+    assert company['memo_file'] == str(tmp_path / "deal_memo_acme.md")
+    assert (company['quality_json'], company['overall_score']) == (str(tmp_path / "deal_memo_acme_quality.json"), 7.5)
+    assert memo_versions.get_version(conn, "deal_memo_acme.md")['overall_score'] == 7.5
+    conn.close()
+
+
+def test_fresh_artifacts_found_from_another_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "deal_memo_acme.md").write_text("## Executive Summary\n\nAcme sells anvils.\n")
+    (tmp_path / "deal_memo_acme_quality.json").write_text("{}")
+    conn = company_registry.connect(str(tmp_path / "memo_jobs.db"))
+    company_registry.record_memo(conn, "acme.io", "https://acme.io", "deal_memo_acme.md", "deal_memo@v1")
+    company_registry.record_quality(conn, "deal_memo_acme.md", "deal_memo_acme_quality.json", 7.5)
+
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    company = company_registry.fresh_artifacts(conn, "acme.io", prompt_label="deal_memo@v1")
+    assert company is not None
+    assert memo_versions.get_version(conn, str(tmp_path / "deal_memo_acme.md"))['quality_json'] == company['quality_json']
+    conn.close()
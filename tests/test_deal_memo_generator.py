@@ -0,0 +1,22 @@
+from datetime import datetime
+
+import deal_memo_generator
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 11, 20, 10, 15, 0)
+
+
+def test_save_memo_same_second_gets_unique_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(deal_memo_generator, 'datetime', FrozenDatetime)
+
+    first = deal_memo_generator.save_memo("https://acme.io", "first memo")
+    second = deal_memo_generator.save_memo("https://acme.io", "second memo")
+
+    assert first == "deal_memo_acme_io_20251120_101500.md"
+    assert second == "deal_memo_acme_io_20251120_101500_2.md"
+    assert (tmp_path / first).read_text().endswith("first memo")
+    assert (tmp_path / second).read_text().endswith("second memo")
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import improvement_engine
+
+RATINGS = ['good', 'needs-work', 'wrong', 'needs_work', 'good']
+
+
+@pytest.fixture
+def feedback_dir(tmp_path):
+    for i in range(40):
+        data = {
+            'exported_at': f"2025-09-{i % 28 + 1:02d}T12:00:00",
+            'overall_quality_score': i % 10,
+            'section_feedback': {
+                'market_analysis': {'rating': RATINGS[i % 5], 'correction': f"market fix {i}"},
+                'team_assessment': {'rating': RATINGS[(i + 1) % 5], 'correction': f"team fix {i}"},
+            },
+        }
+        (tmp_path / f"feedback_{i}.json").write_text(json.dumps(data))
+    return str(tmp_path)
+
+
+def test_streaming_matches_full_analysis(feedback_dir):
+    full = improvement_engine.analyze_feedback_patterns(improvement_engine.load_feedback_files(feedback_dir))
+    streamed = improvement_engine.analyze_feedback_patterns(
+        improvement_engine.iter_feedback_files(feedback_dir), streaming=True, reservoir_size=5)
+
+    assert streamed['total_memos_reviewed'] == full['total_memos_reviewed'] == 40
+    assert dict(streamed['section_ratings']) == dict(full['section_ratings'])
+    assert streamed['avg_quality_score'] == pytest.approx(full['avg_quality_score'])
+    assert streamed['problematic_sections'] == full['problematic_sections']
+
+
+def test_streaming_samples_only_problem_corrections(feedback_dir):
+    streamed = improvement_engine.analyze_feedback_patterns(
+        improvement_engine.iter_feedback_files(feedback_dir), streaming=True, reservoir_size=5)
+
+    by_section = {}
+    for corr in streamed['all_corrections']:
+        by_section.setdefault(corr['section'], []).append(corr)
+    assert set(by_section) == {'market_analysis', 'team_assessment'}
+    for corrections in by_section.values():
+        assert len(corrections) == 5
+        assert all(corr['rating'] in ['needs_work', 'wrong'] for corr in corrections)
+    # 3 of every 5 ratings are problems, so 24 of the 40 corrections per section were eligible
+    assert streamed['corrections_seen'] == {'market_analysis': 24, 'team_assessment': 24}
@@ -0,0 +1,139 @@
+import pytest
+
+import job_queue
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = job_queue.connect(str(tmp_path / "jobs.db"))
+    yield conn
+    conn.close()
+
+
+def enqueue_chain(conn, max_attempts=2):
+    fetch = job_queue.enqueue(conn, 'fetch', {'url': "https://acme.io"}, max_attempts=max_attempts)
+    generate = job_queue.enqueue(conn, 'generate', {'url': "https://acme.io"}, depends_on=fetch)
+    return fetch, generate
+
+
+def status(conn, job_id):
+    row = conn.execute("SELECT status, attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return row['status'], row['attempts']
+
+
+def make_available(conn):
+    conn.execute("UPDATE jobs SET available_at = 0")
+
+
+def test_failures_retry_then_dead_letter_dependents(conn, monkeypatch):
+    def failing_fetch(conn, job, payload):
+        raise RuntimeError("site down")
+    monkeypatch.setitem(job_queue.STAGE_HANDLERS, 'fetch', failing_fetch)
+    fetch, generate = enqueue_chain(conn)
+
+    job, outcome = job_queue.run_one(conn, "w1")
+    assert (job['id'], outcome) == (fetch, 'pending')
+    assert job_queue.run_one(conn, "w1") is None  # backing off
+
+    make_available(conn)
+    assert job_queue.run_one(conn, "w1")[1] == 'dead'
+    assert status(conn, fetch) == ('dead', 2)
+    assert status(conn, generate)[0] == 'dead'
+
+    assert job_queue.retry_dead(conn, fetch) == 2
+    assert status(conn, fetch) == ('pending', 0)
+    assert status(conn, generate) == ('pending', 0)
+
+
+def test_recover_stale_counts_crash_and_dead_letters(conn):
+    fetch, generate = enqueue_chain(conn)
+    for expected in ('pending', 'dead'):
+        make_available(conn)
+        assert job_queue.claim_next(conn, "w1")['id'] == fetch
+        conn.execute("UPDATE jobs SET started_at = 0 WHERE id = ?", (fetch,))
+        assert job_queue.recover_stale(conn) == 1
+        assert status(conn, fetch)[0] == expected
+
+    assert status(conn, fetch) == ('dead', 2)
+    assert status(conn, generate)[0] == 'dead'
+
+
+def test_recover_stale_ignores_recent_jobs(conn):
+    fetch, _ = enqueue_chain(conn)
+    job_queue.claim_next(conn, "w1")
+    assert job_queue.recover_stale(conn) == 0
+    assert status(conn, fetch) == ('running', 1)
+
+
+def test_interrupt_releases_running_job(conn, monkeypatch):
+    def interrupted_fetch(conn, job, payload):
+        raise KeyboardInterrupt
+    monkeypatch.setitem(job_queue.STAGE_HANDLERS, 'fetch', interrupted_fetch)
+    fetch, _ = enqueue_chain(conn)
+
+    with pytest.raises(KeyboardInterrupt):
+        job_queue.run_one(conn, "w1")
+    assert status(conn, fetch) == ('pending', 0)
+
+
+def test_cli_retry_requires_numeric_job_id(tmp_path, capsys):
+    import cli
+
+    db = str(tmp_path / "jobs.db")
+    for argv in (["queue", "retry", "--db", db], ["queue", "retry", "abc", "--db", db]):
+        with pytest.raises(SystemExit):
+            cli.main(argv)
+    assert cli.main(["queue", "retry", "7", "--db", db]) == 1
+    assert "Job 7 is not dead-lettered" in capsys.readouterr().out
+
+
+def test_analyze_reads_memo_through_read_memo(conn, tmp_path, monkeypatch):
+    import quality_analyzer
+
+    memo_file = tmp_path / "deal_memo_acme.md"
+    memo_file.write_text("x" * 50)
+    monkeypatch.setattr(quality_analyzer.read_memo, '__defaults__', (10,))
+    analyzed = []
+
+    def fake_analyze(memo_content, memo_filepath):
+        analyzed.append(memo_content)
+        return {'overall_score': 7}
+    monkeypatch.setattr(quality_analyzer, 'analyze_memo_quality', fake_analyze)
+    monkeypatch.setattr(quality_analyzer, 'save_quality_report', lambda report, path: ("q.json", "q.txt"))
+
+    generate = job_queue.enqueue(conn, 'generate', {'url': "https://acme.io"})
+    job_queue.mark_done(conn, generate, {'memo_file': str(memo_file)})
+    job_queue.enqueue(conn, 'analyze', {'url': "https://acme.io"}, depends_on=generate)
+
+    assert job_queue.run_one(conn, "w1")[1] == 'done'
+    assert analyzed[0].startswith("x" * 10 + "\n\n[Memo truncated")
+
+
+def dead_worker_id():
+    import subprocess
+    import sys
+
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return f"worker-{process.pid}"
+
+
+def test_recover_stale_picks_up_jobs_of_dead_workers_right_away(conn):
+    fetch, _ = enqueue_chain(conn)
+    job_queue.claim_next(conn, dead_worker_id())
+    assert job_queue.recover_stale(conn) == 1
+    assert status(conn, fetch) == ('pending', 1)
+
+
+def test_exit_when_idle_finishes_jobs_orphaned_by_dead_worker(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "jobs.db")
+    conn = job_queue.connect(db_path)
+    fetch = job_queue.enqueue(conn, 'fetch', {'url': "https://acme.io"})
+    job_queue.claim_next(conn, dead_worker_id())
+
+    monkeypatch.setattr(job_queue, 'RETRY_BACKOFF_SECONDS', 0)
+    monkeypatch.setitem(job_queue.STAGE_HANDLERS, 'fetch', lambda conn, job, payload: {'content': "ok"})
+    job_queue.worker_loop(db_path, exit_when_idle=True, poll_interval=0)
+
+    assert status(conn, fetch) == ('done', 2)
+    conn.close()
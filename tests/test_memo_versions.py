@@ -0,0 +1,137 @@
+import pytest
+
+import memo_versions
+import registry_db
+
+MEMO_V1 = """# Investment Memo: https://acme.io
+
+*Generated: November 20, 2025 at 10:15 AM*
+
+## 1. Executive Summary
+
+Acme sells anvils to coyotes.
+
+## 2. Market Analysis
+
+The anvil market is large.
+
+### Market risks
+
+Demand is seasonal.
+
+## 3. Risks & Considerations
+
+Roadrunners.
+"""
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = registry_db.connect(str(tmp_path / "memo_jobs.db"))
+    yield conn
+    conn.close()
+
+
+def record(conn, tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    return memo_versions.record_version(conn, "acme.io", str(path), "deal_memo@v1")
+
+
+def test_split_memo_sections_ignores_nested_keyword_headings():
+    sections = memo_versions.split_memo_sections(MEMO_V1)
+    assert [name for name, _ in sections] == [
+        memo_versions.PREAMBLE, 'executive_summary', 'market_analysis', 'risks_considerations'
+    ]
+    assert "Demand is seasonal." in dict(sections)['market_analysis']
+
+
+def test_bold_subheadings_do_not_split_markdown_sections():
+    memo = """## 1. EXECUTIVE SUMMARY
+
+Acme sells anvils.
+
+## 2. COMPANY OVERVIEW
+
+Founded in 1949.
+
+**Product Roadmap**
+
+Rocket skates next year.
+
+**Business Model:** subscriptions
+
+## 3. MARKET ANALYSIS
+
+Large.
+
+## 4. PRODUCT & TECHNOLOGY
+
+Anvils.
+
+## 5. BUSINESS MODEL
+
+Per-anvil pricing.
+
+## 6. COMPETITIVE LANDSCAPE
+
+None.
+"""
+    sections = dict(memo_versions.split_memo_sections(memo))
+    assert list(sections) == ['executive_summary', 'company_overview', 'market_analysis',
+                              'product_technology', 'business_model', 'competitive_landscape']
+    assert "Rocket skates" in sections['company_overview']
+    assert sections['product_technology'].startswith("## 4. PRODUCT & TECHNOLOGY")
+    assert "Per-anvil pricing" in sections['business_model']
+
+
+def test_bold_headings_split_memos_without_markdown_headings():
+    memo = "**Executive Summary**\n\nAcme.\n\n**Market Analysis**\n\nLarge.\n"
+    assert [section for section, _ in memo_versions.split_memo_sections(memo)] == ['executive_summary', 'market_analysis']
+
+
+def test_rewrapping_does_not_change_fingerprint():
+    rewrapped = MEMO_V1.replace("Acme sells anvils to coyotes.", "Acme sells anvils\nto   coyotes.")
+    assert memo_versions.memo_fingerprint(rewrapped) == memo_versions.memo_fingerprint(MEMO_V1)
+
+
+def test_diff_versions_reports_changed_added_and_unchanged(conn, tmp_path):
+    assert record(conn, tmp_path, "v1.md", MEMO_V1) == 1
+    v2 = (MEMO_V1.replace("November 20", "November 21")
+          .replace("The anvil market is large.", "The anvil market is huge.")
+          + "\n## 4. Business Model\n\nSubscriptions.\n")
+    assert record(conn, tmp_path, "v2.md", v2) == 2
+    assert record(conn, tmp_path, "v2.md", v2) == 2  # already recorded
+
+    old, new = memo_versions.list_versions(conn, "acme.io")
+    diff = memo_versions.diff_versions(conn, old, new, include_text=True)
+    assert {section: entry['status'] for section, entry in diff.items()} == {
+        'executive_summary': 'unchanged',
+        'market_analysis': 'changed',
+        'risks_considerations': 'unchanged',
+        'business_model': 'added',
+    }
+    assert (diff['market_analysis']['chunks_added'], diff['market_analysis']['chunks_removed']) == (1, 1)
+    assert diff['market_analysis']['added'] == ["The anvil market is huge."]
+    assert diff['market_analysis']['removed'] == ["The anvil market is large."]
+
+
+def test_quality_report_records_changes_and_score_moves(conn, tmp_path):
+    record(conn, tmp_path, "v1.md", MEMO_V1)
+    memo_versions.link_quality(conn, str(tmp_path / "v1.md"), "v1_quality.json", 6.0,
+                               {'market_analysis': {'score': 5}, 'executive_summary': {'score': 7}})
+    record(conn, tmp_path, "v2.md", MEMO_V1.replace("is large", "is huge"))
+
+    report = {'overall_score': 7.0, 'section_scores': {'market_analysis': {'score': 8}}}
+    memo_versions.annotate_quality_report(conn, report, str(tmp_path / "v2.md"))
+    changes = report['metadata']['memo_changes']
+    assert (changes['version'], changes['previous_version'], changes['previous_overall_score']) == (2, 1, 6.0)
+    assert changes['changed_sections'] == ['market_analysis']
+    assert (changes['sections']['market_analysis']['previous_score'], changes['sections']['market_analysis']['score']) == (5, 8)
+
+
+def test_first_version_has_no_changes(conn, tmp_path):
+    record(conn, tmp_path, "v1.md", MEMO_V1)
+    report = {'overall_score': 7.0}
+    memo_versions.annotate_quality_report(conn, report, str(tmp_path / "v1.md"))
+    assert 'metadata' not in report
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import pytest
+
+import model_router
+
+NO_BUDGET = {'max_cost_usd': None, 'max_latency_seconds': None}
+
+
+def message(text, stop_reason='end_turn'):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)], stop_reason=stop_reason,
+                           usage=SimpleNamespace(input_tokens=1000, output_tokens=500))
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    model_router.reset_run_stats()
+    yield
+    model_router.set_budget()
+
+
+def test_no_budget_uses_standard_tier():
+    for task in ('deal_memo', 'quality_analysis', 'prompt_improvement'):
+        assert [tier for tier, _ in model_router.plan_route(task, "prompt", NO_BUDGET)] == ['standard']
+    assert model_router.plan_route('deal_memo', "prompt")[0] == ('standard', 4000)
+
+
+def test_budget_starts_on_fast_tier_and_escalates():
+    plan = model_router.plan_route('deal_memo', "prompt", {'max_cost_usd': 1.0, 'max_latency_seconds': None})
+    assert [tier for tier, _ in plan] == ['fast', 'standard']
+
+
+def test_tight_cost_budget_still_picks_a_tier():
+    plan = model_router.plan_route('deal_memo', "prompt", {'max_cost_usd': 0.000001, 'max_latency_seconds': None})
+    assert plan[0][0] == 'fast'
+
+
+def test_latency_budget_trims_max_tokens_to_floor():
+    plan = model_router.plan_route('deal_memo', "prompt", {'max_cost_usd': None, 'max_latency_seconds': 10})
+    assert plan[0] == ('fast', 2500)
+
+
+def test_long_input_skips_fast_tier():
+    prompt = "x" * (model_router.TIERS['fast']['max_input_tokens'] + 1) * model_router.CHARS_PER_TOKEN
+    plan = model_router.plan_route('deal_memo', prompt, {'max_cost_usd': 10.0, 'max_latency_seconds': None})
+    assert [tier for tier, _ in plan] == ['standard']
+
+
+def test_failed_validation_escalates(monkeypatch):
+    calls = []
+
+    def fake_create(prompt, max_tokens, model):
+        calls.append(model)
+        return message("short" if len(calls) == 1 else "long enough")
+    monkeypatch.setattr(model_router, 'create_message', fake_create)
+    model_router.set_budget(max_cost_usd=1.0)
+
+    text = model_router.complete_routed('deal_memo', "prompt", lambda t: None if t != "short" else "too short")
+    assert text == "long enough"
+    assert calls == [model_router.TIERS['fast']['model'], model_router.TIERS['standard']['model']]
+    stats = model_router.run_stats()
+    assert (stats['tasks'], stats['escalations'], stats['calls']) == (1, 1, {'fast': 1, 'standard': 1})
+
+
+def test_truncated_result_escalates(monkeypatch):
+    results = iter([message("cut", 'max_tokens'), message("full")])
+    monkeypatch.setattr(model_router, 'create_message', lambda *args: next(results))
+    model_router.set_budget(max_cost_usd=1.0)
+    assert model_router.complete_routed('quality_analysis', "prompt") == "full"
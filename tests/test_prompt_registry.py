@@ -0,0 +1,42 @@
+import pytest
+
+import prompt_registry
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    path = str(tmp_path / "prompt_registry.json")
+    prompt_registry.register_prompt('memo', "Memo for {company_url}", path=path)
+    return path
+
+
+def test_register_and_render(registry_path):
+    prompt = prompt_registry.get_prompt('memo', path=registry_path)
+    assert prompt.version == 1
+    assert prompt.fields == ['company_url']
+    assert prompt.render(company_url="https://x.io") == "Memo for https://x.io"
+
+
+def test_register_rejects_different_fields(registry_path):
+    with pytest.raises(ValueError):
+        prompt_registry.register_prompt('memo', "Memo for {company_name}", path=registry_path)
+    with pytest.raises(ValueError):
+        prompt_registry.register_prompt('memo', "Memo for {company_url} {extra}", path=registry_path)
+    assert len(prompt_registry.load_registry(registry_path)['prompts']['memo']['versions']) == 1
+
+
+def test_register_rejects_malformed_template(registry_path):
+    with pytest.raises(ValueError):
+        prompt_registry.register_prompt('memo', "Memo for {company_url", path=registry_path)
+
+
+def test_promote_new_version(registry_path):
+    version = prompt_registry.register_prompt('memo', "Better memo for {company_url}", path=registry_path)
+    assert prompt_registry.get_prompt('memo', path=registry_path).version == 1
+    assert prompt_registry.promote_prompt('memo', version, path=registry_path) == version
+    assert prompt_registry.get_prompt('memo', path=registry_path).version == version
+
+
+def test_promote_unknown_version(registry_path):
+    with pytest.raises(KeyError):
+        prompt_registry.promote_prompt('memo', 7, path=registry_path)
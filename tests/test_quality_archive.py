@@ -0,0 +1,113 @@
+import json
+import os
+
+import pytest
+
+import quality_archive
+
+
+def make_report(memo_file, overall, business_model=7):
+    return {
+        'overall_score': overall,
+        'section_scores': {'business_model': {'score': business_model, 'completeness': 'complete'}},
+        'red_flags': [],
+        'metadata': {'memo_file': memo_file, 'prompt_version': 'deal_memo@v1'},
+    }
+
+
+def write_reports(directory, reports):
+    paths = []
+    for report in reports:
+        path = directory / f"{report['metadata']['memo_file'][:-3]}_quality.json"
+        path.write_text(json.dumps(report))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    directory = tmp_path / "reports"
+    directory.mkdir()
+    return directory
+
+
+def test_round_trip_keeps_fractional_scores(source_dir, tmp_path):
+    reports = [make_report("deal_memo_a.md", 6.7, 6.3), make_report("deal_memo_b.md", 8, None)]
+    paths = write_reports(source_dir, reports)
+    [(segment, count)] = quality_archive.convert_reports(paths, str(tmp_path / "archive"))
+    assert count == 2
+
+    with quality_archive.QualityArchive(segment) as archive:
+        assert archive.keys() == ["deal_memo_a.md", "deal_memo_b.md"]
+        assert archive.get("deal_memo_a.md") == reports[0]
+        assert archive.column('overall_score') == [6.7, 8]
+        assert archive.column('business_model') == [6.3, None]
+        assert archive.column('business_model_completeness') == ['complete', 'complete']
+        assert archive.column('overall_score')[0] == archive.get("deal_memo_a.md")['overall_score']
+
+
+def test_segments_split_by_size(source_dir, tmp_path):
+    paths = write_reports(source_dir, [make_report(f"deal_memo_{i}.md", i) for i in range(5)])
+    segments = quality_archive.convert_reports(paths, str(tmp_path / "archive"), segment_size=2)
+    assert [count for _, count in segments] == [2, 2, 1]
+    assert list(quality_archive.scan_column([s for s, _ in segments], 'overall_score'))[-1] == ("deal_memo_4.md", 4)
+
+
+def test_rebuild_skips_archived_memos(source_dir, tmp_path):
+    output_dir = str(tmp_path / "archive")
+    paths = write_reports(source_dir, [make_report("deal_memo_a.md", 6)])
+    quality_archive.convert_reports(paths, output_dir)
+    assert quality_archive.convert_reports(paths, output_dir) == []
+
+    paths += write_reports(source_dir, [make_report("deal_memo_b.md", 7)])
+    [(segment, count)] = quality_archive.convert_reports(paths, output_dir)
+    assert count == 1
+    with quality_archive.QualityArchive(segment) as archive:
+        assert archive.keys() == ["deal_memo_b.md"]
+
+
+def test_numbering_continues_after_deleted_segment(source_dir, tmp_path):
+    output_dir = str(tmp_path / "archive")
+    paths = write_reports(source_dir, [make_report(f"deal_memo_{i}.md", i) for i in range(3)])
+    segments = quality_archive.convert_reports(paths, output_dir, segment_size=1)
+    os.remove(segments[0][0])
+
+    paths = write_reports(source_dir, [make_report("deal_memo_new.md", 9)])
+    [(segment, _)] = quality_archive.convert_reports(paths, output_dir)
+    assert os.path.basename(segment) == "quality_archive_00004.qar"
+    with quality_archive.QualityArchive(segments[2][0]) as archive:
+        assert archive.keys() == ["deal_memo_2.md"]
+
+
+def test_unreadable_reports_are_skipped_and_listed(source_dir, tmp_path):
+    paths = write_reports(source_dir, [make_report("deal_memo_a.md", 6)])
+    corrupt = source_dir / "deal_memo_bad_quality.json"
+    corrupt.write_text("{not json")
+    output_dir = tmp_path / "archive"
+
+    errors = []
+    [(segment, count)] = quality_archive.convert_reports([str(corrupt)] + paths, str(output_dir), errors=errors)
+    assert count == 1
+    assert [source for source, _ in errors] == [str(corrupt)]
+    assert sorted(os.listdir(output_dir)) == ["quality_archive_00001.qar"]
+
+
+def test_failed_segment_write_leaves_no_tmp_file(source_dir, tmp_path):
+    (source_dir / "bad_quality.json").write_text("{")
+    paths = write_reports(source_dir, [make_report("deal_memo_a.md", 6)]) + [str(source_dir / "bad_quality.json")]
+    with pytest.raises(ValueError):
+        quality_archive.write_segment(str(tmp_path / "x.qar"), quality_archive.iter_quality_json(paths))
+    assert not os.path.exists(tmp_path / "x.qar.tmp")
+    assert not os.path.exists(tmp_path / "x.qar")
+
+
+def test_newer_report_for_archived_memo_is_flagged(source_dir, tmp_path):
+    output_dir = str(tmp_path / "archive")
+    report = make_report("deal_memo_a.md", 6)
+    report['metadata']['analyzed_at'] = "2025-11-20T10:00:00"
+    quality_archive.convert_reports(write_reports(source_dir, [report]), output_dir)
+
+    report['metadata']['analyzed_at'] = "2025-11-21T10:00:00"
+    outdated = []
+    assert quality_archive.convert_reports(write_reports(source_dir, [report]), output_dir, outdated=outdated) == []
+    assert outdated == [(str(source_dir / "deal_memo_a_quality.json"), "deal_memo_a.md")]
@@ -0,0 +1,18 @@
+import fnmatch
+import os
+
+import report_renderers
+
+
+def test_outputs_never_look_like_memos():
+    for name, renderer in report_renderers.RENDERERS.items():
+        path = report_renderers.output_path("deal_memo_acme_20250101_120000_quality.json", renderer['suffix'])
+        assert not fnmatch.fnmatch(os.path.basename(path), "deal_memo_*.md"), name
+
+
+def test_unknown_format_rejected_by_cli(tmp_path, capsys):
+    import cli
+
+    (tmp_path / "deal_memo_acme_quality.json").write_text("{}")
+    assert cli.main(["render", str(tmp_path), "--format", "pdf"]) == 1
+    assert "Unknown format(s): pdf" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import trend_rollups
+
+START = datetime(2025, 9, 1, 12, 0)  # a Monday
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = trend_rollups.connect(str(tmp_path / "memo_jobs.db"))
+    yield conn
+    conn.close()
+
+
+def write_feedback(directory, weekly_ratings, prompt_version="deal_memo@v1"):
+    """One feedback file per rating; weekly_ratings[i] lists the ratings given in week i"""
+    count = 0
+    for week, ratings in enumerate(weekly_ratings):
+        for i, rating in enumerate(ratings):
+            data = {
+                'exported_at': (START + timedelta(weeks=week, hours=i)).isoformat(),
+                'memo_metadata': {'memo_prompt_version': prompt_version},
+                'overall_quality_score': 7,
+                'section_feedback': {'market_analysis': {'rating': rating}},
+            }
+            (directory / f"feedback_{week}_{i}.json").write_text(json.dumps(data))
+            count += 1
+    return count
+
+
+def totals(conn):
+    return conn.execute("SELECT SUM(total), SUM(wrong), SUM(score_count) FROM rollups WHERE granularity = 'week'").fetchone()
+
+
+def test_rerunning_ingestion_does_not_double_count(conn, tmp_path):
+    count = write_feedback(tmp_path, [["good", "wrong"], ["needs-work"]])
+    assert trend_rollups.update_rollups(conn, str(tmp_path), str(tmp_path)) == count
+    before = tuple(totals(conn))
+    assert before == (3, 1, 3)
+
+    assert trend_rollups.update_rollups(conn, str(tmp_path), str(tmp_path)) == 0
+    assert tuple(totals(conn)) == before
+
+    write_feedback(tmp_path, [[], [], ["good"]])
+    assert trend_rollups.update_rollups(conn, str(tmp_path), str(tmp_path)) == 1
+    assert tuple(totals(conn)) == (4, 1, 4)
+
+    assert trend_rollups.rebuild_rollups(conn, str(tmp_path), str(tmp_path)) == count + 1
+    assert tuple(totals(conn)) == (4, 1, 4)
+
+
+def test_shift_is_flagged_with_direction_and_bucket(conn, tmp_path):
+    write_feedback(tmp_path, [["good"] * 6] * 3 + [["wrong"] * 5 + ["good"]] * 3)
+    trend_rollups.update_rollups(conn, str(tmp_path), str(tmp_path))
+
+    trends = trend_rollups.summarize_trends(conn, "week")
+    [change] = trends['drift']
+    assert change['section'] == 'market_analysis'
+    assert change['direction'] == 'worsened'
+    assert change['bucket'] == trend_rollups.buckets_for(START + timedelta(weeks=3))['week']
+    assert (change['rate_before'], round(change['rate_after'], 2)) == (0.0, 0.83)
+    assert trends['prompt_versions']['deal_memo@v1']['total'] == 36
+
+
+def test_stable_series_is_not_flagged(conn, tmp_path):
+    write_feedback(tmp_path, [["good", "good", "wrong", "good"]] * 6)
+    trend_rollups.update_rollups(conn, str(tmp_path), str(tmp_path))
+    trends = trend_rollups.summarize_trends(conn, "week")
+    assert trends['drift'] == []
+    assert len(trends['sections']['market_analysis']) == 6
+
+
+def test_improvement_is_flagged():
+    points = [("w1", 8, 10), ("w2", 9, 10), ("w3", 1, 10), ("w4", 0, 10)]
+    change = trend_rollups.detect_change_point(points)
+    assert (change['bucket'], change['direction']) == ("w3", 'improved')
+
+
+def test_small_segments_are_ignored():
+    assert trend_rollups.detect_change_point([("w1", 0, 2), ("w2", 2, 2)]) is None
+
+
+def test_pattern_reports_do_not_create_the_database(tmp_path):
+    import improvement_engine
+
+    db_path = tmp_path / "memo_jobs.db"
+    write_feedback(tmp_path, [["good"]])
+    assert improvement_engine.load_trends(str(tmp_path), db_path=str(db_path)) is None
+    assert not db_path.exists()
+
+    trend_rollups.connect(str(db_path)).close()
+    assert improvement_engine.load_trends(str(tmp_path), db_path=str(db_path))['sections']
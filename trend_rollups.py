@@ -0,0 +1,263 @@
+"""
+Trend Rollups
+Daily/weekly aggregates of section ratings and scores per prompt version, with drift detection
+
+New feedback_*.json and *_quality.json files are folded into the aggregates
+once (tracked in rollup_sources), so trend reports read precomputed rows
+instead of rescanning every file. Files are treated as immutable once
+ingested; use rebuild_rollups after editing or deleting them.
+"""
+
+import os
+import glob
+import itertools
+import json
+import math
+import sqlite3
+from datetime import datetime
+
+DEFAULT_DB_PATH = "memo_jobs.db"
+GRANULARITIES = ("day", "week")
+OVERALL = "_overall"
+UNVERSIONED = "unversioned"
+DRIFT_Z_THRESHOLD = 2.58  # two-proportion z-score, ~99% confidence
+MIN_SEGMENT_REVIEWS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_sources (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    kind TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    section TEXT NOT NULL,
+    good INTEGER NOT NULL DEFAULT 0,
+    needs_work INTEGER NOT NULL DEFAULT 0,
+    wrong INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    score_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, granularity, bucket, prompt_version, section)
+);
+"""
+
+# Quality report completeness mapped onto the feedback rating scale
+COMPLETENESS_RATINGS = {'complete': 'good', 'partial': 'needs_work', 'insufficient': 'wrong'}
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def buckets_for(moment):
+    """Bucket labels for a datetime, e.g. {'day': '2025-11-20', 'week': '2025-W47'}"""
+    iso = moment.isocalendar()
+    return {'day': moment.strftime("%Y-%m-%d"), 'week': f"{iso[0]}-W{iso[1]:02d}"}
+
+
+def _add(conn, kind, moment, prompt_version, section, rating=None, score=None):
+    counts = {'good': 0, 'needs_work': 0, 'wrong': 0}
+    if rating in counts:
+        counts[rating] = 1
+    total = 1 if rating else 0
+    score_count = 1 if isinstance(score, (int, float)) else 0
+
+    for granularity, bucket in buckets_for(moment).items():
+        conn.execute(
+            """
+            INSERT INTO rollups (kind, granularity, bucket, prompt_version, section,
+                                 good, needs_work, wrong, total, score_sum, score_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kind, granularity, bucket, prompt_version, section) DO UPDATE SET
+                good = good + excluded.good,
+                needs_work = needs_work + excluded.needs_work,
+                wrong = wrong + excluded.wrong,
+                total = total + excluded.total,
+                score_sum = score_sum + excluded.score_sum,
+                score_count = score_count + excluded.score_count
+            """,
+            (kind, granularity, bucket, prompt_version, section,
+             counts['good'], counts['needs_work'], counts['wrong'], total,
+             score if score_count else 0, score_count)
+        )
+
+
+def ingest_feedback(conn, data, fallback_time):
+    """Fold one exported feedback file into the rollups"""
+    metadata = data.get('memo_metadata') or {}
+    moment = (parse_timestamp(data.get('exported_at')) or parse_timestamp(metadata.get('analyzed_at'))
+              or fallback_time)
+    prompt_version = metadata.get('memo_prompt_version') or UNVERSIONED
+
+    _add(conn, 'feedback', moment, prompt_version, OVERALL, score=data.get('overall_quality_score'))
+    for section_id, feedback in data.get('section_feedback', {}).items():
+        rating = (feedback.get('rating') or '').replace('-', '_') or None
+        _add(conn, 'feedback', moment, prompt_version, section_id, rating=rating)
+
+
+def ingest_quality_report(conn, quality_report, fallback_time):
+    """Fold one quality report into the rollups (completeness counts as the rating)"""
+    metadata = quality_report.get('metadata') or {}
+    moment = parse_timestamp(metadata.get('analyzed_at')) or fallback_time
+    prompt_version = metadata.get('memo_prompt_version') or UNVERSIONED
+
+    _add(conn, 'quality', moment, prompt_version, OVERALL, score=quality_report.get('overall_score'))
+    for section_id, section in quality_report.get('section_scores', {}).items():
+        rating = COMPLETENESS_RATINGS.get(str(section.get('completeness', '')).lower())
+        _add(conn, 'quality', moment, prompt_version, section_id, rating=rating, score=section.get('score'))
+
+
+def update_rollups(conn, feedback_dir=".", quality_dir="."):
+    """Ingest feedback and quality files not seen before; returns the number of new files"""
+    # Paths are streamed and checked one at a time, so memory doesn't grow with the archive
+    candidates = itertools.chain(
+        (('feedback', path) for path in glob.iglob(os.path.join(feedback_dir, "feedback_*.json"))),
+        (('quality', path) for path in glob.iglob(os.path.join(quality_dir, "*_quality.json")))
+    )
+
+    ingested = 0
+    for kind, path in candidates:
+        path = os.path.abspath(path)
+        if conn.execute("SELECT 1 FROM rollup_sources WHERE path = ?", (path,)).fetchone():
+            continue
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        fallback_time = datetime.fromtimestamp(os.path.getmtime(path))
+        conn.execute("BEGIN")
+        try:
+            if kind == 'feedback':
+                ingest_feedback(conn, data, fallback_time)
+            else:
+                ingest_quality_report(conn, data, fallback_time)
+            conn.execute("INSERT INTO rollup_sources (path, kind, ingested_at) VALUES (?, ?, ?)",
+                         (path, kind, datetime.now().timestamp()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        ingested += 1
+
+    return ingested
+
+
+def rebuild_rollups(conn, feedback_dir=".", quality_dir="."):
+    """Drop all aggregates and ingest every file again"""
+    conn.execute("DELETE FROM rollups")
+    conn.execute("DELETE FROM rollup_sources")
+    return update_rollups(conn, feedback_dir, quality_dir)
+
+
+def section_series(conn, kind="feedback", granularity="week", prompt_version=None):
+    """{section: [(bucket, problems, total, avg_score)]} in bucket order, summed over prompt versions"""
+    query = ("SELECT section, bucket, SUM(needs_work + wrong) AS problems, SUM(total) AS total, "
+             "SUM(score_sum) AS score_sum, SUM(score_count) AS score_count "
+             "FROM rollups WHERE kind = ? AND granularity = ?")
+    params = [kind, granularity]
+    if prompt_version:
+        query += " AND prompt_version = ?"
+        params.append(prompt_version)
+    query += " GROUP BY section, bucket ORDER BY section, bucket"
+
+    series = {}
+    for row in conn.execute(query, params):
+        avg_score = row['score_sum'] / row['score_count'] if row['score_count'] else None
+        series.setdefault(row['section'], []).append((row['bucket'], row['problems'], row['total'], avg_score))
+    return series
+
+
+def prompt_version_summary(conn, kind="feedback"):
+    """Problem rate and average overall score per prompt version"""
+    summary = {}
+    for row in conn.execute(
+        "SELECT prompt_version, section, SUM(needs_work + wrong) AS problems, SUM(total) AS total, "
+        "SUM(score_sum) AS score_sum, SUM(score_count) AS score_count "
+        "FROM rollups WHERE kind = ? AND granularity = 'day' GROUP BY prompt_version, section",
+        (kind,)
+    ):
+        entry = summary.setdefault(row['prompt_version'], {'problems': 0, 'total': 0, 'avg_score': None})
+        if row['section'] == OVERALL:
+            entry['avg_score'] = row['score_sum'] / row['score_count'] if row['score_count'] else None
+            entry['memos'] = row['score_count']
+        else:
+            entry['problems'] += row['problems']
+            entry['total'] += row['total']
+    return summary
+
+
+def detect_change_point(points, z_threshold=DRIFT_Z_THRESHOLD, min_reviews=MIN_SEGMENT_REVIEWS):
+    """
+    Find the split in a (bucket, problems, total, ...) series where the problem rate shifts most
+    Uses a two-proportion z-test between the pooled buckets before and after each split;
+    returns None unless the strongest shift exceeds z_threshold
+    """
+    best = None
+    for split in range(1, len(points)):
+        before_problems = sum(p[1] for p in points[:split])
+        before_total = sum(p[2] for p in points[:split])
+        after_problems = sum(p[1] for p in points[split:])
+        after_total = sum(p[2] for p in points[split:])
+        if before_total < min_reviews or after_total < min_reviews:
+            continue
+
+        rate_before = before_problems / before_total
+        rate_after = after_problems / after_total
+        pooled = (before_problems + after_problems) / (before_total + after_total)
+        variance = pooled * (1 - pooled) * (1 / before_total + 1 / after_total)
+        if variance == 0:
+            continue
+        z = (rate_after - rate_before) / math.sqrt(variance)
+
+        if best is None or abs(z) > abs(best['z']):
+            best = {'bucket': points[split][0], 'rate_before': rate_before, 'rate_after': rate_after,
+                    'reviews_before': before_total, 'reviews_after': after_total, 'z': z}
+
+    if best and abs(best['z']) >= z_threshold:
+        best['direction'] = 'worsened' if best['z'] > 0 else 'improved'
+        return best
+    return None
+
+
+def summarize_trends(conn, granularity="week", kind="feedback", recent_buckets=6):
+    """Trend summary for the pattern report, read entirely from the aggregates"""
+    series = section_series(conn, kind, granularity)
+    sections = {}
+    drift = []
+    for section, points in series.items():
+        if section == OVERALL:
+            continue
+        sections[section] = points[-recent_buckets:]
+        change = detect_change_point(points)
+        if change:
+            change['section'] = section
+            drift.append(change)
+    drift.sort(key=lambda c: abs(c['z']), reverse=True)
+
+    return {
+        'granularity': granularity,
+        'kind': kind,
+        'overall': series.get(OVERALL, [])[-recent_buckets:],
+        'sections': sections,
+        'drift': drift,
+        'prompt_versions': prompt_version_summary(conn, kind)
+    }